@@ -168,6 +168,8 @@ class AdvancedAnalyticsEngine:
         try:
             logger.info(f"Generating comprehensive report from {start_date} to {end_date}")
             
+            self._validate_date_range(start_date, end_date)
+            
             # Get portfolio data if not provided
             if portfolio_data is None:
                 portfolio_data = self._get_portfolio_data(start_date, end_date)
@@ -212,6 +214,20 @@ class AdvancedAnalyticsEngine:
             logger.error(f"Error generating comprehensive report: {e}")
             raise
     
+    def _validate_date_range(self, start_date: str, end_date: str):
+        """Validate report date range, raising ValueError on bad input"""
+        try:
+            start = pd.Timestamp(start_date)
+            end = pd.Timestamp(end_date)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid date range {start_date!r} to {end_date!r}: {e}") from e
+        
+        if pd.isna(start) or pd.isna(end):
+            raise ValueError(f"Invalid date range {start_date!r} to {end_date!r}: missing date")
+        
+        if start > end:
+            raise ValueError(f"Invalid date range: start date {start_date} is after end date {end_date}")
+    
     def _get_portfolio_data(self, start_date: str, end_date: str) -> pd.DataFrame:
         """Get portfolio data for analysis"""
         try:
@@ -250,7 +250,60 @@ class AdvancedRiskEngine:
         except Exception as e:
             logger.error(f"Failed to run stress test: {e}")
             raise
-    
+
+    async def run_stress_test_batch(
+        self,
+        portfolio_data: pd.DataFrame,
+        scenarios: List[StressTestScenario]
+    ) -> List[StressTestResult]:
+        """Run several stress scenarios against the same portfolio in one pass"""
+        try:
+            logger.info(f"Running batch stress test for {len(scenarios)} scenarios")
+
+            original_portfolio_value = portfolio_data['portfolio_value'].iloc[-1]
+
+            # Scenarios only rescale portfolio value and volatility, so the
+            # return-based metrics are shared by every scenario
+            stressed_var = await self._calculate_portfolio_var(portfolio_data)
+            expected_shortfall_stressed = await self._calculate_expected_shortfall(portfolio_data)
+            worst_case_loss = await self._calculate_worst_case_loss(portfolio_data)
+            risk_metrics = await self._calculate_stress_risk_metrics(portfolio_data)
+
+            # Vectorised shock multipliers, matching _apply_stress_scenario
+            market_shocks = np.array([s.market_shock for s in scenarios], dtype=float)
+            rate_shocks = np.array([s.interest_rate_shock for s in scenarios], dtype=float)
+            multipliers = (1 + market_shocks) * np.where(rate_shocks != 0, 1 + rate_shocks * 0.1, 1.0)
+
+            stressed_values = original_portfolio_value * multipliers
+            portfolio_losses = original_portfolio_value - stressed_values
+            loss_percentages = (portfolio_losses / original_portfolio_value) * 100
+
+            results = []
+            for scenario, stressed_value, loss, loss_pct in zip(
+                scenarios, stressed_values, portfolio_losses, loss_percentages
+            ):
+                result = StressTestResult(
+                    scenario_name=scenario.name,
+                    original_portfolio_value=original_portfolio_value,
+                    stressed_portfolio_value=stressed_value,
+                    portfolio_loss=loss,
+                    loss_percentage=loss_pct,
+                    var_stressed=stressed_var,
+                    expected_shortfall_stressed=expected_shortfall_stressed,
+                    worst_case_loss=worst_case_loss,
+                    recovery_time_estimate=self._estimate_recovery_time(loss, portfolio_data),
+                    risk_metrics=dict(risk_metrics)
+                )
+                results.append(result)
+                self.stress_test_results[scenario.name] = result
+
+            logger.info(f"Batch stress test completed for {len(scenarios)} scenarios")
+            return results
+
+        except Exception as e:
+            logger.error(f"Failed to run batch stress test: {e}")
+            raise
+
     async def run_scenario_analysis(
         self, 
         portfolio_data: pd.DataFrame,
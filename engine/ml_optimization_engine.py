@@ -303,7 +303,8 @@ class MLOptimizationEngine:
     async def generate_ml_features(self, market_data: pd.DataFrame) -> pd.DataFrame:
         """Generate advanced ML features from market data"""
         try:
-            features = market_data.copy()
+            # Returns, moving averages and volatility the later stages build on
+            features = self._generate_basic_features(market_data)
             
             # Technical indicators
             features = self._add_technical_indicators(features)
@@ -616,7 +617,7 @@ class MLOptimizationEngine:
         data = data.replace([np.inf, -np.inf], np.nan)
         
         # Forward fill NaN values
-        data = data.fillna(method='ffill')
+        data = data.ffill()
         
         # Drop remaining NaN rows
         data = data.dropna()
@@ -120,7 +120,7 @@ class StrategySignal(Base):
     execution_price = Column(Float, nullable=True)
     
     __table_args__ = (
-        Index('idx_symbol_timestamp', 'symbol', 'timestamp'),
+        Index('idx_signal_symbol_timestamp', 'symbol', 'timestamp'),
         Index('idx_signal_type_executed', 'signal_type', 'is_executed'),
         Index('idx_execution_signals', 'strategy_execution_id', 'timestamp'),
     )
@@ -0,0 +1,51 @@
+"""
+Shared pytest configuration for the AutoPPM test suite
+"""
+
+import pandas as pd
+import pytest
+
+
+def pytest_addoption(parser):
+    """Register custom command line options"""
+    parser.addoption(
+        "--runslow",
+        action="store_true",
+        default=False,
+        help="run tests marked as slow"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip slow tests unless --runslow is given"""
+    if config.getoption("--runslow"):
+        return
+    
+    skip_slow = pytest.mark.skip(reason="need --runslow option to run")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def pandas_copy_on_write():
+    """Enable pandas Copy-on-Write so shared fixture frames are copied lazily"""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        # Copy-on-Write is always enabled from pandas 3.0
+        yield
+        return
+    
+    with pd.option_context("mode.copy_on_write", True):
+        yield
+
+
+@pytest.fixture(scope="module")
+def client():
+    """FastAPI test client shared by the tests of a module"""
+    # Imported lazily so modules that do not use the API do not load the app
+    from fastapi.testclient import TestClient
+    from main import app
+    
+    # The context manager runs the app lifespan once per module
+    with TestClient(app) as test_client:
+        yield test_client
@@ -4,17 +4,14 @@ Tests Production Deployment, Strategy Marketplace, and Advanced Analytics engine
 """
 
 import pytest
-import asyncio
+import dataclasses
+import time
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-from unittest.mock import Mock, patch, MagicMock
-from pathlib import Path
+from datetime import datetime
 
 from engine.production_deployment_engine import (
     get_production_engine,
     ProductionDeploymentEngine,
-    SystemMetrics,
     Alert,
     AlertRule,
     AutomationRule
@@ -23,9 +20,7 @@ from engine.production_deployment_engine import (
 from engine.strategy_marketplace_engine import (
     get_strategy_marketplace_engine,
     StrategyMarketplaceEngine,
-    StrategyMetadata,
-    StrategyReview,
-    StrategyDownload
+    StrategyMetadata
 )
 
 from engine.advanced_analytics_engine import (
@@ -34,84 +29,183 @@ from engine.advanced_analytics_engine import (
     PerformanceMetrics,
     RiskMetrics,
     AttributionAnalysis,
-    FactorAnalysis
+    FactorAnalysis,
+    AnalyticsReport
 )
 
 
+# Neutral metrics; tests override only the fields they exercise
+_DEFAULT_PERFORMANCE_METRICS = PerformanceMetrics(
+    total_return=0.0,
+    annualized_return=0.0,
+    volatility=0.0,
+    sharpe_ratio=0.0,
+    sortino_ratio=0.0,
+    calmar_ratio=0.0,
+    max_drawdown=0.0,
+    win_rate=0.0,
+    profit_factor=0.0,
+    average_win=0.0,
+    average_loss=0.0,
+    largest_win=0.0,
+    largest_loss=0.0,
+    total_trades=0,
+    winning_trades=0,
+    losing_trades=0,
+    average_trade_duration=0.0,
+    best_month=0.0,
+    worst_month=0.0,
+    consecutive_wins=0,
+    consecutive_losses=0
+)
+
+_DEFAULT_RISK_METRICS = RiskMetrics(
+    var_95=0.0,
+    var_99=0.0,
+    expected_shortfall_95=0.0,
+    expected_shortfall_99=0.0,
+    tail_risk=0.0,
+    beta=0.0,
+    alpha=0.0,
+    information_ratio=0.0,
+    treynor_ratio=0.0,
+    jensen_alpha=0.0,
+    downside_deviation=0.0,
+    semi_deviation=0.0,
+    skewness=0.0,
+    kurtosis=0.0,
+    correlation_with_market=0.0,
+    sector_concentration=0.0,
+    geographic_concentration=0.0,
+    currency_exposure=0.0
+)
+
+
+@pytest.fixture(scope="session")
+def fixed_now():
+    """Fixed timestamp for deterministic test objects"""
+    return datetime(2024, 1, 1, 12, 0, 0)
+
+
+# Engine fixtures are module-scoped (not session-scoped) so that each
+# pytest-xdist worker warms its own singleton when classes are distributed
+# with ``--dist=loadscope``.
+@pytest.fixture(scope="module")
+def production_engine():
+    """Get production deployment engine instance"""
+    return get_production_engine()
+
+
+@pytest.fixture(scope="module")
+def marketplace_engine():
+    """Get strategy marketplace engine instance"""
+    return get_strategy_marketplace_engine()
+
+
+@pytest.fixture(scope="module")
+def analytics_engine():
+    """Get advanced analytics engine instance"""
+    return get_advanced_analytics_engine()
+
+
+@pytest.fixture(scope="module")
+def analytics_data(analytics_engine):
+    """Generate one year of portfolio and benchmark data for the calculation tests"""
+    portfolio_data = analytics_engine._get_portfolio_data("2023-01-01", "2023-12-31")
+    benchmark_data = analytics_engine._get_benchmark_data("2023-01-01", "2023-12-31")
+    return portfolio_data, benchmark_data
+
+
+@pytest.fixture
+def first_strategy_id(marketplace_engine):
+    """Get the id of the first available marketplace strategy"""
+    return next(iter(marketplace_engine.available_strategies))
+
+
+@pytest.fixture
+def downloaded_strategy(marketplace_engine, first_strategy_id):
+    """Download the first marketplace strategy and remove it afterwards"""
+    marketplace_engine.download_strategy(first_strategy_id, "test_user")
+    yield first_strategy_id
+    if first_strategy_id in marketplace_engine.downloaded_strategies:
+        marketplace_engine.remove_strategy(first_strategy_id)
+
+
+class TestEngineInitialization:
+    """Test Final Phase engine initialization"""
+    
+    @pytest.mark.parametrize("factory,engine_class,attributes", [
+        (get_production_engine, ProductionDeploymentEngine,
+         ["orchestrator", "ml_engine", "risk_engine", "broker_engine"]),
+        (get_strategy_marketplace_engine, StrategyMarketplaceEngine,
+         ["orchestrator", "ml_engine", "backtesting_engine"]),
+        (get_advanced_analytics_engine, AdvancedAnalyticsEngine,
+         ["orchestrator", "ml_engine", "risk_engine", "backtesting_engine"]),
+    ])
+    def test_engine_initialization(self, factory, engine_class, attributes):
+        """Test engine initialization"""
+        engine = factory()
+        assert isinstance(engine, engine_class)
+        for attribute in attributes:
+            assert getattr(engine, attribute) is not None, attribute
+
+
 class TestProductionDeploymentEngine:
     """Test Production Deployment Engine functionality"""
     
-    def test_engine_initialization(self):
-        """Test engine initialization"""
-        engine = get_production_engine()
-        assert engine is not None
-        assert isinstance(engine, ProductionDeploymentEngine)
-        assert engine.orchestrator is not None
-        assert engine.ml_engine is not None
-        assert engine.risk_engine is not None
-        assert engine.broker_engine is not None
-    
-    def test_alert_rules_initialization(self):
+    def test_alert_rules_initialization(self, production_engine):
         """Test alert rules initialization"""
-        engine = get_production_engine()
-        assert len(engine.alert_rules) > 0
+        assert len(production_engine.alert_rules) > 0
         
         # Check specific alert rules
-        rule_names = [rule.name for rule in engine.alert_rules]
+        rule_names = [rule.name for rule in production_engine.alert_rules]
         assert "High CPU Usage" in rule_names
         assert "High Memory Usage" in rule_names
         assert "Critical Portfolio Loss" in rule_names
     
-    def test_automation_rules_initialization(self):
+    def test_automation_rules_initialization(self, production_engine):
         """Test automation rules initialization"""
-        engine = get_production_engine()
-        assert len(engine.automation_rules) > 0
+        assert len(production_engine.automation_rules) > 0
         
         # Check specific automation rules
-        rule_names = [rule.name for rule in engine.automation_rules]
+        rule_names = [rule.name for rule in production_engine.automation_rules]
         assert "Daily Risk Assessment" in rule_names
         assert "Portfolio Rebalancing" in rule_names
         assert "System Backup" in rule_names
     
-    def test_system_health_monitoring(self):
+    def test_system_health_monitoring(self, production_engine):
         """Test system health monitoring"""
-        engine = get_production_engine()
-        
         # Get system health
-        health = engine.get_system_health()
+        health = production_engine.get_system_health()
         assert 'status' in health
         assert 'health_score' in health
         assert 'timestamp' in health
         assert 'active_alerts' in health
     
-    def test_alert_acknowledgment(self):
+    def test_alert_acknowledgment(self, production_engine, fixed_now):
         """Test alert acknowledgment"""
-        engine = get_production_engine()
-        
         # Create a test alert
         test_alert = Alert(
             id="test_alert_001",
             type="warning",
             message="Test alert message",
-            timestamp=datetime.now()
+            timestamp=fixed_now
         )
-        engine.active_alerts.append(test_alert)
+        production_engine.active_alerts.append(test_alert)
         
         # Acknowledge alert
-        success = engine.acknowledge_alert("test_alert_001", "test_user")
+        success = production_engine.acknowledge_alert("test_alert_001", "test_user")
         assert success is True
         
         # Check alert state
-        alert = engine.active_alerts[0]
+        alert = production_engine.active_alerts[0]
         assert alert.acknowledged is True
         assert alert.acknowledged_by == "test_user"
         assert alert.acknowledged_at is not None
     
-    def test_performance_summary(self):
+    def test_performance_summary(self, production_engine):
         """Test performance summary generation"""
-        engine = get_production_engine()
-        
-        summary = engine.get_performance_summary()
+        summary = production_engine.get_performance_summary()
         assert isinstance(summary, dict)
         
         # Check if summary contains expected fields
@@ -121,19 +215,15 @@ class TestProductionDeploymentEngine:
             assert 'average_memory_usage' in summary
             assert 'total_alerts' in summary
     
-    def test_system_backup(self):
+    def test_system_backup(self, production_engine):
         """Test system backup functionality"""
-        engine = get_production_engine()
-        
-        backup_result = engine.backup_system()
+        backup_result = production_engine.backup_system()
         assert isinstance(backup_result, dict)
         assert 'timestamp' in backup_result
         assert 'overall_status' in backup_result
     
-    def test_alert_rule_management(self):
+    def test_alert_rule_management(self, production_engine):
         """Test alert rule management"""
-        engine = get_production_engine()
-        
         # Add new alert rule
         new_rule = AlertRule(
             name="Test Alert Rule",
@@ -144,17 +234,15 @@ class TestProductionDeploymentEngine:
             severity="info"
         )
         
-        success = engine.add_alert_rule(new_rule)
+        success = production_engine.add_alert_rule(new_rule)
         assert success is True
         
         # Check if rule was added
-        rule_names = [rule.name for rule in engine.alert_rules]
+        rule_names = [rule.name for rule in production_engine.alert_rules]
         assert "Test Alert Rule" in rule_names
     
-    def test_automation_rule_management(self):
+    def test_automation_rule_management(self, production_engine):
         """Test automation rule management"""
-        engine = get_production_engine()
-        
         # Add new automation rule
         new_rule = AutomationRule(
             name="Test Automation Rule",
@@ -163,94 +251,74 @@ class TestProductionDeploymentEngine:
             actions=["test_action"]
         )
         
-        success = engine.add_automation_rule(new_rule)
+        success = production_engine.add_automation_rule(new_rule)
         assert success is True
         
         # Check if rule was added
-        rule_names = [rule.name for rule in engine.automation_rules]
+        rule_names = [rule.name for rule in production_engine.automation_rules]
         assert "Test Automation Rule" in rule_names
 
 
 class TestStrategyMarketplaceEngine:
     """Test Strategy Marketplace Engine functionality"""
     
-    def test_engine_initialization(self):
-        """Test engine initialization"""
-        engine = get_strategy_marketplace_engine()
-        assert engine is not None
-        assert isinstance(engine, StrategyMarketplaceEngine)
-        assert engine.orchestrator is not None
-        assert engine.ml_engine is not None
-        assert engine.backtesting_engine is not None
-    
-    def test_available_strategies(self):
+    def test_available_strategies(self, marketplace_engine):
         """Test available strategies loading"""
-        engine = get_strategy_marketplace_engine()
-        assert len(engine.available_strategies) > 0
+        assert len(marketplace_engine.available_strategies) > 0
         
         # Check specific strategies
-        strategy_names = [s.name for s in engine.available_strategies.values()]
+        strategy_names = [s.name for s in marketplace_engine.available_strategies.values()]
         assert "Advanced Momentum Pro" in strategy_names
         assert "Mean Reversion Master" in strategy_names
         assert "ML Sentiment Trader" in strategy_names
     
-    def test_strategy_search(self):
+    def test_strategy_search(self, marketplace_engine):
         """Test strategy search functionality"""
-        engine = get_strategy_marketplace_engine()
-        
         # Search by category
-        momentum_strategies = engine.search_strategies(category="momentum")
-        assert len(momentum_strategies) > 0
-        assert all(s.category == "momentum" for s in momentum_strategies)
+        momentum_strategies = marketplace_engine.search_strategies(category="momentum")
+        categories = {s.category for s in momentum_strategies}
+        assert categories == {"momentum"}
         
         # Search by risk level
-        low_risk_strategies = engine.search_strategies(risk_level="low")
-        assert len(low_risk_strategies) > 0
-        assert all(s.risk_level == "low" for s in low_risk_strategies)
+        low_risk_strategies = marketplace_engine.search_strategies(risk_level="low")
+        risk_levels = {s.risk_level for s in low_risk_strategies}
+        assert risk_levels == {"low"}
         
         # Search by rating
-        high_rated_strategies = engine.search_strategies(min_rating=4.5)
-        assert len(high_rated_strategies) > 0
-        assert all(s.rating >= 4.5 for s in high_rated_strategies)
+        high_rated_strategies = marketplace_engine.search_strategies(min_rating=4.5)
+        ratings = [s.rating for s in high_rated_strategies]
+        assert ratings and min(ratings) >= 4.5
     
-    def test_strategy_details(self):
+    def test_strategy_details(self, marketplace_engine, first_strategy_id):
         """Test strategy details retrieval"""
-        engine = get_strategy_marketplace_engine()
-        
-        # Get first available strategy
-        strategy_id = list(engine.available_strategies.keys())[0]
-        strategy = engine.get_strategy_details(strategy_id)
+        strategy = marketplace_engine.get_strategy_details(first_strategy_id)
         
         assert strategy is not None
-        assert strategy.id == strategy_id
+        assert strategy.id == first_strategy_id
         assert hasattr(strategy, 'name')
         assert hasattr(strategy, 'description')
         assert hasattr(strategy, 'author')
         assert hasattr(strategy, 'version')
     
-    def test_strategy_download(self):
+    def test_strategy_download(self, marketplace_engine, first_strategy_id):
         """Test strategy download functionality"""
-        engine = get_strategy_marketplace_engine()
-        
         # Download first available strategy
-        strategy_id = list(engine.available_strategies.keys())[0]
-        download_result = engine.download_strategy(strategy_id, "test_user")
+        download_result = marketplace_engine.download_strategy(first_strategy_id, "test_user")
         
         assert download_result['success'] is True
-        assert download_result['strategy_id'] == strategy_id
+        assert download_result['strategy_id'] == first_strategy_id
         assert 'download_path' in download_result
         assert 'validation_result' in download_result
         
         # Check if strategy was added to downloaded strategies
-        assert strategy_id in engine.downloaded_strategies
+        assert first_strategy_id in marketplace_engine.downloaded_strategies
     
-    def test_strategy_validation(self):
+    def test_strategy_validation(self, marketplace_engine, fixed_now, tmp_path):
         """Test strategy validation"""
-        engine = get_strategy_marketplace_engine()
-        
-        # Create a test strategy directory
-        test_strategy_dir = Path("strategies/marketplace/test_strategy")
-        test_strategy_dir.mkdir(parents=True, exist_ok=True)
+        # Create a test strategy directory outside the real marketplace tree
+        # so a failing assertion cannot leave it behind for later runs
+        test_strategy_dir = tmp_path / "test_strategy"
+        test_strategy_dir.mkdir()
         
         # Create test files
         (test_strategy_dir / "test_strategy.py").write_text("print('Hello World')")
@@ -279,22 +347,16 @@ class TestStrategyMarketplaceEngine:
             price=0.0,
             rating=4.0,
             downloads=0,
-            last_updated=datetime.now()
+            last_updated=fixed_now
         )
         
-        validation_result = engine._validate_strategy(test_strategy_dir, test_strategy)
+        validation_result = marketplace_engine._validate_strategy(test_strategy_dir, test_strategy)
         assert validation_result['valid'] is True
-        
-        # Cleanup
-        import shutil
-        shutil.rmtree(test_strategy_dir)
     
-    def test_strategy_reviews(self):
+    def test_strategy_reviews(self, marketplace_engine):
         """Test strategy review functionality"""
-        engine = get_strategy_marketplace_engine()
-        
         # Add a review
-        review_result = engine.add_strategy_review(
+        review_result = marketplace_engine.add_strategy_review(
             "strategy_001", "test_user", 5, "Excellent strategy!"
         )
         
@@ -302,16 +364,14 @@ class TestStrategyMarketplaceEngine:
         assert 'review_id' in review_result
         
         # Get reviews
-        reviews = engine.get_strategy_reviews("strategy_001")
+        reviews = marketplace_engine.get_strategy_reviews("strategy_001")
         assert len(reviews) > 0
         assert reviews[0].rating == 5
         assert reviews[0].comment == "Excellent strategy!"
     
-    def test_marketplace_statistics(self):
+    def test_marketplace_statistics(self, marketplace_engine):
         """Test marketplace statistics"""
-        engine = get_strategy_marketplace_engine()
-        
-        stats = engine.get_marketplace_stats()
+        stats = marketplace_engine.get_marketplace_stats()
         assert isinstance(stats, dict)
         assert 'total_strategies' in stats
         assert 'total_downloads' in stats
@@ -319,89 +379,63 @@ class TestStrategyMarketplaceEngine:
         assert 'categories' in stats
         assert 'average_rating' in stats
     
-    def test_strategy_update(self):
+    def test_strategy_update(self, marketplace_engine, downloaded_strategy):
         """Test strategy update functionality"""
-        engine = get_strategy_marketplace_engine()
-        
-        # First download a strategy
-        strategy_id = list(engine.available_strategies.keys())[0]
-        engine.download_strategy(strategy_id, "test_user")
-        
         # Try to update (should fail if already up to date)
-        update_result = engine.update_strategy(strategy_id)
+        update_result = marketplace_engine.update_strategy(downloaded_strategy)
         
         # Should either succeed or indicate already up to date
         assert 'success' in update_result
         if not update_result['success']:
             assert 'already up to date' in update_result['error']
     
-    def test_strategy_removal(self):
+    def test_strategy_removal(self, marketplace_engine, downloaded_strategy):
         """Test strategy removal functionality"""
-        engine = get_strategy_marketplace_engine()
-        
-        # First download a strategy
-        strategy_id = list(engine.available_strategies.keys())[0]
-        engine.download_strategy(strategy_id, "test_user")
-        
         # Remove strategy
-        removal_result = engine.remove_strategy(strategy_id)
+        removal_result = marketplace_engine.remove_strategy(downloaded_strategy)
         assert removal_result['success'] is True
         
         # Check if strategy was removed
-        assert strategy_id not in engine.downloaded_strategies
+        assert downloaded_strategy not in marketplace_engine.downloaded_strategies
 
 
 class TestAdvancedAnalyticsEngine:
     """Test Advanced Analytics Engine functionality"""
     
-    def test_engine_initialization(self):
-        """Test engine initialization"""
-        engine = get_advanced_analytics_engine()
-        assert engine is not None
-        assert isinstance(engine, AdvancedAnalyticsEngine)
-        assert engine.orchestrator is not None
-        assert engine.ml_engine is not None
-        assert engine.risk_engine is not None
-        assert engine.backtesting_engine is not None
-    
-    def test_portfolio_data_generation(self):
+    def test_portfolio_data_generation(self, analytics_engine):
         """Test portfolio data generation"""
-        engine = get_advanced_analytics_engine()
-        
+        # Only the schema is checked here, so a short window is enough;
+        # the calculation tests below still use a full year of data
         start_date = "2023-01-01"
-        end_date = "2023-12-31"
+        end_date = "2023-01-03"
         
-        portfolio_data = engine._get_portfolio_data(start_date, end_date)
+        portfolio_data = analytics_engine._get_portfolio_data(start_date, end_date)
         assert isinstance(portfolio_data, pd.DataFrame)
-        assert len(portfolio_data) > 0
+        assert len(portfolio_data) == 3
         assert 'date' in portfolio_data.columns
         assert 'returns' in portfolio_data.columns
         assert 'portfolio_value' in portfolio_data.columns
     
-    def test_benchmark_data_generation(self):
+    def test_benchmark_data_generation(self, analytics_engine):
         """Test benchmark data generation"""
-        engine = get_advanced_analytics_engine()
-        
+        # Schema check only, a short window is enough
         start_date = "2023-01-01"
-        end_date = "2023-12-31"
+        end_date = "2023-01-03"
         
-        benchmark_data = engine._get_benchmark_data(start_date, end_date)
+        benchmark_data = analytics_engine._get_benchmark_data(start_date, end_date)
         assert isinstance(benchmark_data, pd.DataFrame)
-        assert len(benchmark_data) > 0
+        assert len(benchmark_data) == 3
         assert 'date' in benchmark_data.columns
         assert 'returns' in benchmark_data.columns
-        assert 'benchmark_value' in portfolio_data.columns
+        assert 'benchmark_value' in benchmark_data.columns
     
-    def test_performance_metrics_calculation(self):
+    @pytest.mark.slow
+    def test_performance_metrics_calculation(self, analytics_engine, analytics_data):
         """Test performance metrics calculation"""
-        engine = get_advanced_analytics_engine()
-        
-        # Generate test data
-        portfolio_data = engine._get_portfolio_data("2023-01-01", "2023-12-31")
-        benchmark_data = engine._get_benchmark_data("2023-01-01", "2023-12-31")
+        portfolio_data, benchmark_data = analytics_data
         
         # Calculate metrics
-        metrics = engine._calculate_performance_metrics(portfolio_data, benchmark_data)
+        metrics = analytics_engine._calculate_performance_metrics(portfolio_data, benchmark_data)
         
         assert isinstance(metrics, PerformanceMetrics)
         assert hasattr(metrics, 'total_return')
@@ -410,16 +444,13 @@ class TestAdvancedAnalyticsEngine:
         assert hasattr(metrics, 'max_drawdown')
         assert hasattr(metrics, 'win_rate')
     
-    def test_risk_metrics_calculation(self):
+    @pytest.mark.slow
+    def test_risk_metrics_calculation(self, analytics_engine, analytics_data):
         """Test risk metrics calculation"""
-        engine = get_advanced_analytics_engine()
-        
-        # Generate test data
-        portfolio_data = engine._get_portfolio_data("2023-01-01", "2023-12-31")
-        benchmark_data = engine._get_benchmark_data("2023-01-01", "2023-12-31")
+        portfolio_data, benchmark_data = analytics_data
         
         # Calculate metrics
-        metrics = engine._calculate_risk_metrics(portfolio_data, benchmark_data)
+        metrics = analytics_engine._calculate_risk_metrics(portfolio_data, benchmark_data)
         
         assert isinstance(metrics, RiskMetrics)
         assert hasattr(metrics, 'var_95')
@@ -428,16 +459,13 @@ class TestAdvancedAnalyticsEngine:
         assert hasattr(metrics, 'alpha')
         assert hasattr(metrics, 'information_ratio')
     
-    def test_attribution_analysis(self):
+    @pytest.mark.slow
+    def test_attribution_analysis(self, analytics_engine, analytics_data):
         """Test attribution analysis"""
-        engine = get_advanced_analytics_engine()
-        
-        # Generate test data
-        portfolio_data = engine._get_portfolio_data("2023-01-01", "2023-12-31")
-        benchmark_data = engine._get_benchmark_data("2023-01-01", "2023-12-31")
+        portfolio_data, benchmark_data = analytics_data
         
         # Calculate attribution
-        attribution = engine._calculate_attribution_analysis(portfolio_data, benchmark_data)
+        attribution = analytics_engine._calculate_attribution_analysis(portfolio_data, benchmark_data)
         
         assert isinstance(attribution, AttributionAnalysis)
         assert hasattr(attribution, 'total_attribution')
@@ -445,16 +473,13 @@ class TestAdvancedAnalyticsEngine:
         assert hasattr(attribution, 'stock_selection')
         assert hasattr(attribution, 'sector_attribution')
     
-    def test_factor_analysis(self):
+    @pytest.mark.slow
+    def test_factor_analysis(self, analytics_engine, analytics_data):
         """Test factor analysis"""
-        engine = get_advanced_analytics_engine()
-        
-        # Generate test data
-        portfolio_data = engine._get_portfolio_data("2023-01-01", "2023-12-31")
-        benchmark_data = engine._get_benchmark_data("2023-01-01", "2023-12-31")
+        portfolio_data, benchmark_data = analytics_data
         
         # Calculate factor analysis
-        factor_analysis = engine._calculate_factor_analysis(portfolio_data, benchmark_data)
+        factor_analysis = analytics_engine._calculate_factor_analysis(portfolio_data, benchmark_data)
         
         assert isinstance(factor_analysis, FactorAnalysis)
         assert hasattr(factor_analysis, 'factors')
@@ -462,77 +487,42 @@ class TestAdvancedAnalyticsEngine:
         assert hasattr(factor_analysis, 'factor_returns')
         assert hasattr(factor_analysis, 'r_squared')
     
-    def test_recommendations_generation(self):
+    def test_recommendations_generation(self, analytics_engine):
         """Test recommendations generation"""
-        engine = get_advanced_analytics_engine()
-        
-        # Create test metrics
-        performance_metrics = PerformanceMetrics(
-            total_return=0.15,
-            annualized_return=0.12,
-            volatility=0.18,
+        # Create test metrics that breach every recommendation threshold
+        performance_metrics = dataclasses.replace(
+            _DEFAULT_PERFORMANCE_METRICS,
             sharpe_ratio=0.8,  # Below 1.0 threshold
-            sortino_ratio=1.2,
-            calmar_ratio=1.5,
             max_drawdown=-0.20,  # Below -0.15 threshold
-            win_rate=0.45,  # Below 0.5 threshold
-            profit_factor=1.8,
-            average_win=0.02,
-            average_loss=-0.015,
-            largest_win=0.05,
-            largest_loss=-0.03,
-            total_trades=100,
-            winning_trades=45,
-            losing_trades=55,
-            average_trade_duration=1.0,
-            best_month=0.08,
-            worst_month=-0.06,
-            consecutive_wins=5,
-            consecutive_losses=4
+            win_rate=0.45  # Below 0.5 threshold
         )
         
-        risk_metrics = RiskMetrics(
+        risk_metrics = dataclasses.replace(
+            _DEFAULT_RISK_METRICS,
             var_95=-0.035,  # Below -0.03 threshold
-            var_99=-0.05,
-            expected_shortfall_95=-0.04,
-            expected_shortfall_99=-0.06,
-            tail_risk=0.025,
             beta=1.3,  # Above 1.2 threshold
-            alpha=0.02,
-            information_ratio=0.8,
-            treynor_ratio=0.6,
-            jensen_alpha=0.02,
-            downside_deviation=0.15,
-            semi_deviation=0.15,
-            skewness=-0.1,
-            kurtosis=3.2,
-            correlation_with_market=0.85,  # Above 0.8 threshold
-            sector_concentration=0.25,
-            geographic_concentration=0.20,
-            currency_exposure=0.05
+            correlation_with_market=0.85  # Above 0.8 threshold
         )
         
-        recommendations = engine._generate_recommendations(performance_metrics, risk_metrics)
+        recommendations = analytics_engine._generate_recommendations(performance_metrics, risk_metrics)
         
         assert isinstance(recommendations, list)
         assert len(recommendations) > 0
         
-        # Check for specific recommendations
-        recommendation_text = ' '.join(recommendations).lower()
-        assert 'risk-adjusted returns' in recommendation_text
-        assert 'stop-loss' in recommendation_text
-        assert 'entry and exit criteria' in recommendation_text
-        assert 'diversification' in recommendation_text
-        assert 'hedging strategies' in recommendation_text
+        # Check for specific recommendations; each phrase must appear within a
+        # single recommendation rather than across a join boundary
+        recommendations_lower = [r.lower() for r in recommendations]
+        for phrase in ('risk-adjusted returns', 'stop-loss', 'entry and exit criteria',
+                       'diversification', 'hedging strategies'):
+            assert any(phrase in r for r in recommendations_lower), phrase
     
-    def test_comprehensive_report_generation(self):
+    @pytest.mark.slow
+    def test_comprehensive_report_generation(self, analytics_engine):
         """Test comprehensive report generation"""
-        engine = get_advanced_analytics_engine()
-        
         start_date = "2023-01-01"
         end_date = "2023-12-31"
         
-        report = engine.generate_comprehensive_report(start_date, end_date)
+        report = analytics_engine.generate_comprehensive_report(start_date, end_date)
         
         assert isinstance(report, AnalyticsReport)
         assert report.period == f"{start_date} to {end_date}"
@@ -544,11 +534,9 @@ class TestAdvancedAnalyticsEngine:
         assert len(report.recommendations) > 0
         assert len(report.charts) > 0
     
-    def test_performance_summary(self):
+    def test_performance_summary(self, analytics_engine):
         """Test performance summary generation"""
-        engine = get_advanced_analytics_engine()
-        
-        summary = engine.get_performance_summary('1Y')
+        summary = analytics_engine.get_performance_summary('1Y')
         
         assert isinstance(summary, dict)
         assert 'period' in summary
@@ -558,23 +546,19 @@ class TestAdvancedAnalyticsEngine:
         assert 'risk_metrics' in summary
         assert 'recommendations' in summary
     
-    def test_strategy_comparison(self):
+    def test_strategy_comparison(self, analytics_engine):
         """Test strategy comparison"""
-        engine = get_advanced_analytics_engine()
-        
         strategy_ids = ["strategy_001", "strategy_002"]
-        comparison = engine.compare_strategies(strategy_ids, '1Y')
+        comparison = analytics_engine.compare_strategies(strategy_ids, '1Y')
         
         assert isinstance(comparison, dict)
         assert len(comparison) == 2
         assert "strategy_001" in comparison
         assert "strategy_002" in comparison
     
-    def test_benchmark_report(self):
+    def test_benchmark_report(self, analytics_engine):
         """Test benchmark report generation"""
-        engine = get_advanced_analytics_engine()
-        
-        report = engine.generate_benchmark_report("NIFTY50", "1Y")
+        report = analytics_engine.generate_benchmark_report("NIFTY50", "1Y")
         
         assert isinstance(report, dict)
         assert 'benchmark_name' in report
@@ -583,21 +567,19 @@ class TestAdvancedAnalyticsEngine:
         assert 'volatility' in report
         assert 'sharpe_ratio' in report
     
-    def test_report_export(self):
+    def test_report_export(self, analytics_engine):
         """Test report export functionality"""
-        engine = get_advanced_analytics_engine()
-        
         # Generate a report first
-        report = engine.generate_comprehensive_report("2023-01-01", "2023-12-31")
+        report = analytics_engine.generate_comprehensive_report("2023-01-01", "2023-12-31")
         report_id = str(report.timestamp.timestamp())
         
         # Test HTML export
-        html_result = engine.export_report(report_id, 'html')
+        html_result = analytics_engine.export_report(report_id, 'html')
         assert isinstance(html_result, str)
         assert html_result.endswith('.html')
         
         # Test unsupported format
-        unsupported_result = engine.export_report(report_id, 'unsupported')
+        unsupported_result = analytics_engine.export_report(report_id, 'unsupported')
         assert "Unsupported format" in unsupported_result
 
 
@@ -635,14 +617,12 @@ class TestIntegration:
 class TestPerformance:
     """Test performance characteristics"""
     
-    def test_report_generation_speed(self):
+    @pytest.mark.slow
+    def test_report_generation_speed(self, analytics_engine):
         """Test report generation performance"""
-        engine = get_advanced_analytics_engine()
-        
-        import time
         start_time = time.time()
         
-        report = engine.generate_comprehensive_report("2023-01-01", "2023-12-31")
+        report = analytics_engine.generate_comprehensive_report("2023-01-01", "2023-12-31")
         
         end_time = time.time()
         generation_time = end_time - start_time
@@ -651,14 +631,11 @@ class TestPerformance:
         assert generation_time < 30.0  # 30 seconds
         assert report is not None
     
-    def test_strategy_search_speed(self):
+    def test_strategy_search_speed(self, marketplace_engine):
         """Test strategy search performance"""
-        engine = get_strategy_marketplace_engine()
-        
-        import time
         start_time = time.time()
         
-        results = engine.search_strategies(category="momentum", min_rating=4.0)
+        results = marketplace_engine.search_strategies(category="momentum", min_rating=4.0)
         
         end_time = time.time()
         search_time = end_time - start_time
@@ -671,26 +648,25 @@ class TestPerformance:
 class TestErrorHandling:
     """Test error handling and edge cases"""
     
-    def test_invalid_dates(self):
+    @pytest.mark.parametrize("start_date,end_date", [
+        ("invalid-date", "2023-12-31"),  # unparseable format
+        ("2023-13-01", "2023-12-31"),    # out-of-range month
+        ("", "2023-12-31"),              # missing start date
+        ("2023-12-31", "2022-01-01"),    # start after end
+    ])
+    def test_invalid_dates(self, analytics_engine, start_date, end_date):
         """Test handling of invalid dates"""
-        engine = get_advanced_analytics_engine()
-        
-        # Test with invalid date format
-        with pytest.raises(Exception):
-            engine.generate_comprehensive_report("invalid-date", "2023-12-31")
+        with pytest.raises(ValueError):
+            analytics_engine.generate_comprehensive_report(start_date, end_date)
     
-    def test_missing_strategy(self):
+    def test_missing_strategy(self, marketplace_engine):
         """Test handling of missing strategy"""
-        engine = get_strategy_marketplace_engine()
-        
-        result = engine.get_strategy_details("nonexistent_strategy")
+        result = marketplace_engine.get_strategy_details("nonexistent_strategy")
         assert result is None
     
-    def test_invalid_alert_acknowledgment(self):
+    def test_invalid_alert_acknowledgment(self, production_engine):
         """Test handling of invalid alert acknowledgment"""
-        engine = get_production_engine()
-        
-        success = engine.acknowledge_alert("nonexistent_alert", "test_user")
+        success = production_engine.acknowledge_alert("nonexistent_alert", "test_user")
         assert success is False
 
 
@@ -4,11 +4,11 @@ Tests ML optimization engine, advanced risk models, and multi-broker support
 """
 
 import pytest
-import asyncio
+import pytest_asyncio
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from unittest.mock import Mock, patch, MagicMock
+from functools import lru_cache
+from time import perf_counter_ns
 
 from engine.ml_optimization_engine import (
     get_ml_optimization_engine, 
@@ -34,33 +34,153 @@ from engine.multi_broker_engine import (
     MultiBrokerEngine,
     BrokerConfig,
     OrderRoutingDecision,
-    ExecutionQuality,
     BrokerPerformance
 )
 
 
+# Engine getters return process-wide singletons, so the fixtures share one
+# instance (and one event loop, see pytest.ini) across the whole session
+@pytest.fixture(scope="session")
+def ml_engine():
+    """Get ML optimization engine instance"""
+    return get_ml_optimization_engine()
+
+
+@pytest.fixture(scope="session")
+def risk_engine():
+    """Get advanced risk engine instance"""
+    return get_advanced_risk_engine()
+
+
+@pytest.fixture(scope="session")
+def broker_engine():
+    """Get multi-broker engine instance"""
+    return get_multi_broker_engine()
+
+
+# Every fixture draws from its own generator seeded with RNG_SEED, so the
+# generated data does not depend on which tests are selected or in what order
+RNG_SEED = 0xA07077
+
+
+@lru_cache(maxsize=8)
+def _dates(periods, end="2024-01-01"):
+    """Daily date index ending on a fixed day; DatetimeIndex is immutable, so it is safe to share"""
+    return pd.date_range(end=end, periods=periods, freq='D', name='date')
+
+
+def _portfolio_values(returns, initial_value=1000000.0):
+    """Compound daily returns into portfolio values in a single buffer"""
+    values = returns + 1.0
+    np.multiply.accumulate(values, out=values)
+    values *= initial_value
+    return values
+
+
+def _ohlcv_frame(rng, periods):
+    """Build an OHLCV frame from one pre-allocated float64 price block, indexed by date"""
+    prices = np.empty((periods, 4))
+    open_, high, low, close = prices.T
+    
+    # All four prices follow one random walk so the bars stay consistent
+    base = rng.standard_normal(periods)
+    np.cumsum(base, out=base)
+    np.add(base, 100.0, out=close)
+    np.add(close, 0.1 * rng.standard_normal(periods), out=open_)
+    np.maximum(open_, close, out=high)
+    high += 2.0
+    np.minimum(open_, close, out=low)
+    low -= 2.0
+    data = pd.DataFrame(prices, columns=['open', 'high', 'low', 'close'], copy=False)
+    data['volume'] = rng.integers(1000000, 10000000, periods, dtype=np.uint32)
+    data.index = _dates(periods)
+    return data
+
+
+async def _median_runtime(run, repeats=5):
+    """Await run() several times; return the median wall time in seconds and the last result"""
+    timings = []
+    for _ in range(repeats):
+        start_time = perf_counter_ns()
+        result = await run()
+        timings.append(perf_counter_ns() - start_time)
+    return float(np.median(timings)) / 1e9, result
+
+
+def _reference_price_zscore(close, window=20):
+    """Vectorised 20-day price z-score used as a reference for generate_ml_features"""
+    windows = np.lib.stride_tricks.sliding_window_view(close, window)
+    zscore = np.full(len(close), np.nan)
+    zscore[window - 1:] = (close[window - 1:] - windows.mean(axis=1)) / windows.std(axis=1, ddof=1)
+    return zscore
+
+
+# Sample data fixtures are module-scoped: the engines only read from (or copy)
+# the frames they are given, so one instance is shared by every test. Tests
+# that need to modify a frame must take a .copy() first.
+@pytest.fixture(scope="module")
+def sample_data():
+    """Create sample market data for testing"""
+    return _ohlcv_frame(np.random.default_rng(RNG_SEED), 100)
+
+
+@pytest.fixture(scope="module")
+def large_sample_data():
+    """Create 1000 rows of sample market data for performance testing"""
+    return _ohlcv_frame(np.random.default_rng(RNG_SEED), 1000)
+
+
+@pytest.fixture(scope="module")
+def sample_portfolio_data():
+    """Create sample portfolio data for testing"""
+    rng = np.random.default_rng(RNG_SEED)
+    dates = _dates(252)
+    returns = rng.standard_normal(252) * 0.02  # 2% daily volatility
+    
+    data = pd.DataFrame({
+        'date': dates,
+        'portfolio_value': _portfolio_values(returns),  # Start with 1M
+        'returns': returns,
+        'volatility': np.abs(returns) * 2
+    })
+    return data
+
+
+@pytest.fixture(scope="module")
+def returns_portfolio():
+    """Create 100 days of portfolio values and returns for integration testing"""
+    rng = np.random.default_rng(RNG_SEED)
+    dates = _dates(100)
+    data = pd.DataFrame({
+        'date': dates,
+        'portfolio_value': _portfolio_values(rng.standard_normal(100) * 0.02),
+        'returns': rng.standard_normal(100) * 0.02
+    })
+    return data
+
+
+@pytest_asyncio.fixture(scope="module")
+async def sample_features(ml_engine, sample_data):
+    """Generate ML features for sample_data once and share them across tests"""
+    return await ml_engine.generate_ml_features(sample_data)
+
+
+@pytest_asyncio.fixture(scope="module")
+async def trained_model(ml_engine, sample_data):
+    """Create the RELIANCE market prediction model once and return its id"""
+    config = MLModelConfig(
+        model_type='random_forest',
+        feature_columns=['returns', 'ma_5', 'ma_20'],
+        target_column='returns',
+        prediction_horizon=1,
+        retrain_frequency=30
+    )
+    return await ml_engine.create_market_prediction_model('RELIANCE', config)
+
+
 class TestMLOptimizationEngine:
     """Test ML Optimization Engine functionality"""
     
-    @pytest.fixture
-    def ml_engine(self):
-        """Get ML optimization engine instance"""
-        return get_ml_optimization_engine()
-    
-    @pytest.fixture
-    def sample_data(self):
-        """Create sample market data for testing"""
-        dates = pd.date_range(end=datetime.now(), periods=100, freq='D')
-        data = pd.DataFrame({
-            'date': dates,
-            'open': np.random.randn(100).cumsum() + 100,
-            'high': np.random.randn(100).cumsum() + 102,
-            'low': np.random.randn(100).cumsum() + 98,
-            'close': np.random.randn(100).cumsum() + 100,
-            'volume': np.random.randint(1000000, 10000000, 100)
-        })
-        return data
-    
     @pytest.mark.asyncio
     async def test_ml_engine_initialization(self, ml_engine):
         """Test ML engine initialization"""
@@ -87,39 +207,17 @@ class TestMLOptimizationEngine:
         assert config.retrain_frequency == 30
     
     @pytest.mark.asyncio
-    async def test_create_market_prediction_model(self, ml_engine, sample_data):
+    async def test_create_market_prediction_model(self, ml_engine, trained_model):
         """Test creating market prediction model"""
-        config = MLModelConfig(
-            model_type='random_forest',
-            feature_columns=['returns', 'ma_5', 'ma_20'],
-            target_column='returns',
-            prediction_horizon=1,
-            retrain_frequency=30
-        )
-        
-        model_id = await ml_engine.create_market_prediction_model('RELIANCE', config)
-        
-        assert model_id is not None
-        assert model_id in ml_engine.models
-        assert model_id in ml_engine.scalers
-        assert model_id in ml_engine.model_performance
+        assert trained_model is not None
+        assert trained_model in ml_engine.models
+        assert trained_model in ml_engine.scalers
+        assert trained_model in ml_engine.model_performance
     
     @pytest.mark.asyncio
-    async def test_predict_market_movement(self, ml_engine, sample_data):
+    async def test_predict_market_movement(self, ml_engine, sample_data, trained_model):
         """Test market movement prediction"""
-        # First create a model
-        config = MLModelConfig(
-            model_type='random_forest',
-            feature_columns=['returns', 'ma_5', 'ma_20'],
-            target_column='returns',
-            prediction_horizon=1,
-            retrain_frequency=30
-        )
-        
-        model_id = await ml_engine.create_market_prediction_model('RELIANCE', config)
-        
-        # Test prediction
-        prediction = await ml_engine.predict_market_movement(model_id, sample_data)
+        prediction = await ml_engine.predict_market_movement(trained_model, sample_data)
         
         assert isinstance(prediction, MLPrediction)
         assert prediction.timestamp is not None
@@ -153,30 +251,16 @@ class TestMLOptimizationEngine:
         assert result.validation_period == '1Y'
     
     @pytest.mark.asyncio
-    async def test_generate_ml_features(self, ml_engine, sample_data):
+    async def test_generate_ml_features(self, sample_data, sample_features):
         """Test ML feature generation"""
-        features = await ml_engine.generate_ml_features(sample_data)
-        
-        assert isinstance(features, pd.DataFrame)
-        assert len(features.columns) > len(sample_data.columns)  # Should have more features
-        assert not features.isnull().any().any()  # No NaN values
+        assert isinstance(sample_features, pd.DataFrame)
+        assert len(sample_features.columns) > len(sample_data.columns)  # Should have more features
+        assert not sample_features.isnull().any().any()  # No NaN values
     
     @pytest.mark.asyncio
-    async def test_get_model_performance(self, ml_engine, sample_data):
+    async def test_get_model_performance(self, ml_engine, trained_model):
         """Test getting model performance"""
-        # Create a model first
-        config = MLModelConfig(
-            model_type='random_forest',
-            feature_columns=['returns', 'ma_5', 'ma_20'],
-            target_column='returns',
-            prediction_horizon=1,
-            retrain_frequency=30
-        )
-        
-        model_id = await ml_engine.create_market_prediction_model('RELIANCE', config)
-        
-        # Get performance
-        performance = await ml_engine.get_model_performance(model_id)
+        performance = await ml_engine.get_model_performance(trained_model)
         
         assert isinstance(performance, dict)
         assert 'mse' in performance
@@ -184,21 +268,9 @@ class TestMLOptimizationEngine:
         assert 'rmse' in performance
     
     @pytest.mark.asyncio
-    async def test_retrain_model(self, ml_engine, sample_data):
+    async def test_retrain_model(self, ml_engine, trained_model):
         """Test model retraining"""
-        # Create a model first
-        config = MLModelConfig(
-            model_type='random_forest',
-            feature_columns=['returns', 'ma_5', 'ma_20'],
-            target_column='returns',
-            prediction_horizon=1,
-            retrain_frequency=30
-        )
-        
-        model_id = await ml_engine.create_market_prediction_model('RELIANCE', config)
-        
-        # Retrain model
-        success = await ml_engine.retrain_model(model_id)
+        success = await ml_engine.retrain_model(trained_model)
         
         assert success is True
 
@@ -206,25 +278,6 @@ class TestMLOptimizationEngine:
 class TestAdvancedRiskEngine:
     """Test Advanced Risk Engine functionality"""
     
-    @pytest.fixture
-    def risk_engine(self):
-        """Get advanced risk engine instance"""
-        return get_advanced_risk_engine()
-    
-    @pytest.fixture
-    def sample_portfolio_data(self):
-        """Create sample portfolio data for testing"""
-        dates = pd.date_range(end=datetime.now(), periods=252, freq='D')
-        returns = np.random.randn(252) * 0.02  # 2% daily volatility
-        
-        data = pd.DataFrame({
-            'date': dates,
-            'portfolio_value': (1 + returns).cumprod() * 1000000,  # Start with 1M
-            'returns': returns,
-            'volatility': np.abs(returns) * 2
-        })
-        return data
-    
     @pytest.mark.asyncio
     async def test_risk_engine_initialization(self, risk_engine):
         """Test risk engine initialization"""
@@ -273,9 +326,11 @@ class TestAdvancedRiskEngine:
         result = await risk_engine.run_monte_carlo_simulation(sample_portfolio_data)
         
         assert isinstance(result, MonteCarloResult)
-        assert result.var_95 < 0  # VaR should be negative
-        assert result.var_99 < result.var_95  # 99% VaR should be more extreme
-        assert result.max_drawdown < 0  # Max drawdown should be negative
+        # 99% VaR is more extreme than 95% VaR, which (like max drawdown) is negative
+        np.testing.assert_array_less(
+            [result.var_99, result.var_95, result.max_drawdown],
+            [result.var_95, 0, 0]
+        )
         assert 0 <= result.probability_of_loss <= 1  # Probability should be between 0 and 1
     
     @pytest.mark.asyncio
@@ -290,7 +345,25 @@ class TestAdvancedRiskEngine:
         assert result.portfolio_loss > 0  # Should have some loss
         assert result.loss_percentage > 0  # Loss percentage should be positive
         assert result.recovery_time_estimate > 0  # Recovery time should be positive
-    
+
+    @pytest.mark.asyncio
+    async def test_run_stress_test_batch(self, risk_engine, sample_portfolio_data):
+        """Test batched stress tests match the per-scenario results"""
+        scenarios = risk_engine.stress_scenarios
+
+        results = await risk_engine.run_stress_test_batch(sample_portfolio_data, scenarios)
+
+        assert len(results) == len(scenarios)
+        for scenario, result in zip(scenarios, results):
+            expected = await risk_engine.run_stress_test(sample_portfolio_data, scenario)
+            assert result.scenario_name == expected.scenario_name
+            assert np.allclose(
+                [result.stressed_portfolio_value, result.portfolio_loss, result.loss_percentage],
+                [expected.stressed_portfolio_value, expected.portfolio_loss, expected.loss_percentage],
+                rtol=1e-10
+            )
+            assert result.recovery_time_estimate == expected.recovery_time_estimate
+
     @pytest.mark.asyncio
     async def test_run_scenario_analysis(self, risk_engine, sample_portfolio_data):
         """Test scenario analysis"""
@@ -350,11 +423,6 @@ class TestAdvancedRiskEngine:
 class TestMultiBrokerEngine:
     """Test Multi-Broker Engine functionality"""
     
-    @pytest.fixture
-    def broker_engine(self):
-        """Get multi-broker engine instance"""
-        return get_multi_broker_engine()
-    
     @pytest.fixture
     def sample_order_request(self):
         """Create sample order request for testing"""
@@ -513,33 +581,18 @@ class TestIntegration:
     """Test integration between Phase 3 engines"""
     
     @pytest.mark.asyncio
-    async def test_ml_and_risk_integration(self):
+    async def test_ml_and_risk_integration(self, risk_engine, returns_portfolio, sample_features):
         """Test integration between ML and risk engines"""
-        ml_engine = get_ml_optimization_engine()
-        risk_engine = get_advanced_risk_engine()
-        
-        # Create sample data
-        dates = pd.date_range(end=datetime.now(), periods=100, freq='D')
-        data = pd.DataFrame({
-            'date': dates,
-            'portfolio_value': (1 + np.random.randn(100) * 0.02).cumprod() * 1000000,
-            'returns': np.random.randn(100) * 0.02
-        })
-        
         # Test ML feature generation for risk analysis
-        features = await ml_engine.generate_ml_features(data)
-        assert not features.empty
+        assert not sample_features.empty
         
         # Test risk analysis with ML-enhanced data
-        risk_report = await risk_engine.generate_risk_report(data)
+        risk_report = await risk_engine.generate_risk_report(returns_portfolio)
         assert 'recommendations' in risk_report
     
     @pytest.mark.asyncio
-    async def test_broker_and_ml_integration(self):
+    async def test_broker_and_ml_integration(self, ml_engine, broker_engine):
         """Test integration between broker and ML engines"""
-        broker_engine = get_multi_broker_engine()
-        ml_engine = get_ml_optimization_engine()
-        
         # Test order routing with ML insights
         order_request = {
             'symbol': 'RELIANCE',
@@ -569,55 +622,42 @@ class TestPerformance:
     """Test performance characteristics of Phase 3 engines"""
     
     @pytest.mark.asyncio
-    async def test_ml_engine_performance(self):
+    async def test_ml_engine_performance(self, ml_engine, large_sample_data):
         """Test ML engine performance"""
-        ml_engine = get_ml_optimization_engine()
+        # Reference values are computed outside the timed region
+        expected_zscore = _reference_price_zscore(large_sample_data['close'].to_numpy())
         
         # Test feature generation performance
-        dates = pd.date_range(end=datetime.now(), periods=1000, freq='D')
-        large_data = pd.DataFrame({
-            'date': dates,
-            'open': np.random.randn(1000).cumsum() + 100,
-            'high': np.random.randn(1000).cumsum() + 102,
-            'low': np.random.randn(1000).cumsum() + 98,
-            'close': np.random.randn(1000).cumsum() + 100,
-            'volume': np.random.randint(1000000, 10000000, 1000)
-        })
-        
-        start_time = datetime.now()
-        features = await ml_engine.generate_ml_features(large_data)
-        end_time = datetime.now()
-        
-        processing_time = (end_time - start_time).total_seconds()
-        assert processing_time < 5.0  # Should process 1000 rows in under 5 seconds
-        assert len(features) == 1000
-    
-    @pytest.mark.asyncio
-    async def test_risk_engine_performance(self):
-        """Test risk engine performance"""
-        risk_engine = get_advanced_risk_engine()
+        processing_time, features = await _median_runtime(
+            lambda: ml_engine.generate_ml_features(large_sample_data)
+        )
         
+        # About 16 ms per call on one core; the bound leaves room for the
+        # contention of running alongside other xdist workers
+        assert processing_time < 1.0  # Should process 1000 rows in under a second
+        # The first 49 rows go to the 50-day moving average warm-up and the next
+        # 19 to the 20-day rolling statistics, which forward filling cannot fill
+        assert len(features) == 1000 - 49 - 19
+        assert np.allclose(
+            features['price_zscore'].to_numpy(),
+            expected_zscore[large_sample_data.index.get_indexer(features.index)],
+            rtol=1e-6
+        )
+    
+    @pytest.mark.asyncio
+    async def test_risk_engine_performance(self, risk_engine, sample_portfolio_data):
+        """Test risk engine performance"""
         # Test Monte Carlo simulation performance
-        dates = pd.date_range(end=datetime.now(), periods=252, freq='D')
-        data = pd.DataFrame({
-            'date': dates,
-            'portfolio_value': (1 + np.random.randn(252) * 0.02).cumprod() * 1000000,
-            'returns': np.random.randn(252) * 0.02
-        })
-        
-        start_time = datetime.now()
-        result = await risk_engine.run_monte_carlo_simulation(data)
-        end_time = datetime.now()
-        
-        processing_time = (end_time - start_time).total_seconds()
+        start_time = perf_counter_ns()
+        result = await risk_engine.run_monte_carlo_simulation(sample_portfolio_data)
+        
+        processing_time = (perf_counter_ns() - start_time) / 1e9
         assert processing_time < 10.0  # Should complete in under 10 seconds
         assert result.var_95 is not None
     
     @pytest.mark.asyncio
-    async def test_broker_engine_performance(self):
+    async def test_broker_engine_performance(self, broker_engine):
         """Test broker engine performance"""
-        broker_engine = get_multi_broker_engine()
-        
         # Test order routing performance
         order_request = {
             'symbol': 'RELIANCE',
@@ -627,11 +667,10 @@ class TestPerformance:
             'side': 'buy'
         }
         
-        start_time = datetime.now()
-        routing_decision = await broker_engine.route_order(order_request, "hybrid")
-        end_time = datetime.now()
+        processing_time, routing_decision = await _median_runtime(
+            lambda: broker_engine.route_order(order_request, "hybrid")
+        )
         
-        processing_time = (end_time - start_time).total_seconds()
         assert processing_time < 1.0  # Should route in under 1 second
         assert routing_decision.broker_id is not None
 
@@ -640,10 +679,8 @@ class TestErrorHandling:
     """Test error handling in Phase 3 engines"""
     
     @pytest.mark.asyncio
-    async def test_ml_engine_error_handling(self):
+    async def test_ml_engine_error_handling(self, ml_engine):
         """Test ML engine error handling"""
-        ml_engine = get_ml_optimization_engine()
-        
         # Test with invalid data
         with pytest.raises(Exception):
             await ml_engine.create_market_prediction_model('', None)
@@ -653,20 +690,16 @@ class TestErrorHandling:
             await ml_engine.predict_market_movement('non_existent_model', pd.DataFrame())
     
     @pytest.mark.asyncio
-    async def test_risk_engine_error_handling(self):
+    async def test_risk_engine_error_handling(self, risk_engine):
         """Test risk engine error handling"""
-        risk_engine = get_advanced_risk_engine()
-        
         # Test with empty data
         empty_data = pd.DataFrame()
         with pytest.raises(Exception):
             await risk_engine.run_monte_carlo_simulation(empty_data)
     
     @pytest.mark.asyncio
-    async def test_broker_engine_error_handling(self):
+    async def test_broker_engine_error_handling(self, broker_engine):
         """Test broker engine error handling"""
-        broker_engine = get_multi_broker_engine()
-        
         # Test with invalid order request
         invalid_order = {}
         with pytest.raises(Exception):
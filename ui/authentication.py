@@ -4,13 +4,143 @@ Professional authentication with login, registration, and session management
 """
 
 import streamlit as st
-import hashlib
 import json
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
 import sqlite3
 import re
+import secrets
+import threading
+from passlib.context import CryptContext
+
+# Password hashing context; unsalted SHA-256 digests from older accounts still
+# verify and are rehashed with argon2 on the next successful login
+pwd_context = CryptContext(schemes=["argon2", "hex_sha256"], deprecated=["hex_sha256"])
+
+# Character classes for the live strength indicator: bytes.translate maps the
+# whole password through this table in C instead of a regex scan per rule.
+# Non-ASCII bytes map to no class.
+_CLASS_UPPER, _CLASS_LOWER, _CLASS_DIGIT, _CLASS_SPECIAL = 1, 2, 4, 8
+_SPECIAL_CHARS = '!@#$%^&*(),.?":{}|<>'
+
+
+def _build_charclass_lut() -> bytes:
+    lut = bytearray(256)
+    for c in range(ord('A'), ord('Z') + 1):
+        lut[c] = _CLASS_UPPER
+    for c in range(ord('a'), ord('z') + 1):
+        lut[c] = _CLASS_LOWER
+    for c in range(ord('0'), ord('9') + 1):
+        lut[c] = _CLASS_DIGIT
+    for ch in _SPECIAL_CHARS:
+        lut[ord(ch)] = _CLASS_SPECIAL
+    return bytes(lut)
+
+
+_CHARCLASS_LUT = _build_charclass_lut()
+
+# Bump _SCHEMA_VERSION when _SCHEMA_SQL changes; existing databases rerun the
+# (idempotent) script once and record the new version in PRAGMA user_version
+_SCHEMA_VERSION = 1
+
+_SCHEMA_SQL = f"""
+BEGIN;
+
+-- Create users table
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    full_name TEXT,
+    company TEXT,
+    role TEXT DEFAULT 'trader',
+    account_type TEXT DEFAULT 'standard',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP,
+    is_active BOOLEAN DEFAULT 1,
+    email_verified BOOLEAN DEFAULT 0,
+    two_factor_enabled BOOLEAN DEFAULT 0
+);
+
+-- Create sessions table
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    session_token TEXT UNIQUE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    ip_address TEXT,
+    user_agent TEXT,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+-- Create password_resets table
+CREATE TABLE IF NOT EXISTS password_resets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    reset_token TEXT UNIQUE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    used BOOLEAN DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+
+PRAGMA user_version = {_SCHEMA_VERSION};
+COMMIT;
+"""
+
+# validate_session runs on every rerun; positive lookups are reused for a
+# short window so widget interactions do not each hit the sessions table
+_SESSION_CACHE_TTL = 30
+_SESSION_CACHE_MAX = 4096
+
+# Expired sessions are deleted on every Nth login rather than left to
+# accumulate in the table
+_SESSION_SWEEP_EVERY = 64
+
+# Limits enforced at registration, so logins outside them can be rejected
+# before touching the database or the password hasher
+_MIN_PASSWORD_LENGTH = 8
+_MAX_LOGIN_LENGTH = 254
+
+_LOGIN_BY_USERNAME = "SELECT id, username, email, full_name, role, password_hash FROM users WHERE username = ? AND is_active = 1"
+_LOGIN_BY_USERNAME_OR_EMAIL = "SELECT id, username, email, full_name, role, password_hash FROM users WHERE (username = ? OR email = ?) AND is_active = 1"
+
+_RE_EMAIL = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
+# Page stylesheet, served from ui/static by Streamlit (server.enableStaticServing)
+# so the browser fetches and caches it instead of receiving it on every run
+_AUTH_CSS_LINK = '<link rel="stylesheet" href="./app/static/auth.css">'
+
+# Form headers, rendered once per script run
+_LOGIN_HEADER = """
+<div class="auth-container">
+    <div class="auth-header">
+        <h1 class="auth-title">🚀 Welcome Back</h1>
+        <p class="auth-subtitle">Sign in to your AutoPPM account</p>
+    </div>
+</div>
+"""
+
+_REGISTER_HEADER = """
+<div class="auth-container">
+    <div class="auth-header">
+        <h1 class="auth-title">🚀 Join AutoPPM</h1>
+        <p class="auth-subtitle">Create your professional trading account</p>
+    </div>
+</div>
+"""
+
+_FORGOT_PASSWORD_HEADER = """
+<div class="auth-container">
+    <div class="auth-header">
+        <h1 class="auth-title">🔐 Reset Password</h1>
+        <p class="auth-subtitle">Enter your email to receive reset instructions</p>
+    </div>
+</div>
+"""
 
 class AuthenticationSystem:
     """
@@ -28,253 +158,70 @@ class AuthenticationSystem:
     def __init__(self):
         self.db_path = Path("data/users.db")
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._session_cache = {}
+        self._login_counter = 0
         self.setup_database()
-        self.load_custom_css()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the long-lived user database connection"""
+        # Streamlit reruns scripts on worker threads, so the connection is
+        # shared across threads and every use goes through self._lock
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=10000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
     
     def setup_database(self):
         """Setup user database"""
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            # Create users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    full_name TEXT,
-                    company TEXT,
-                    role TEXT DEFAULT 'trader',
-                    account_type TEXT DEFAULT 'standard',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP,
-                    is_active BOOLEAN DEFAULT 1,
-                    email_verified BOOLEAN DEFAULT 0,
-                    two_factor_enabled BOOLEAN DEFAULT 0
-                )
-            ''')
-            
-            # Create sessions table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    session_token TEXT UNIQUE NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP NOT NULL,
-                    ip_address TEXT,
-                    user_agent TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            
-            # Create password_resets table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS password_resets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    reset_token TEXT UNIQUE NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP NOT NULL,
-                    used BOOLEAN DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users (id)
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
+            with self._lock:
+                (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+                if version < _SCHEMA_VERSION:
+                    self._conn.executescript(_SCHEMA_SQL)
             
         except Exception as e:
             st.error(f"Database setup error: {e}")
     
     def load_custom_css(self):
         """Load custom CSS for authentication styling"""
-        st.markdown("""
-        <style>
-        /* Authentication Form Styling */
-        .auth-container {
-            max-width: 400px;
-            margin: 2rem auto;
-            padding: 2rem;
-            background: white;
-            border-radius: 1rem;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-        }
-        
-        .auth-header {
-            text-align: center;
-            margin-bottom: 2rem;
-        }
-        
-        .auth-title {
-            font-size: 2rem;
-            font-weight: 700;
-            color: #1f77b4;
-            margin-bottom: 0.5rem;
-        }
-        
-        .auth-subtitle {
-            color: #666;
-            font-size: 1rem;
-        }
-        
-        .form-group {
-            margin-bottom: 1.5rem;
-        }
-        
-        .form-label {
-            display: block;
-            margin-bottom: 0.5rem;
-            font-weight: 600;
-            color: #333;
-        }
-        
-        .form-input {
-            width: 100%;
-            padding: 0.75rem;
-            border: 2px solid #e1e5e9;
-            border-radius: 0.5rem;
-            font-size: 1rem;
-            transition: border-color 0.3s ease;
-        }
-        
-        .form-input:focus {
-            outline: none;
-            border-color: #1f77b4;
-            box-shadow: 0 0 0 3px rgba(31, 119, 180, 0.1);
-        }
-        
-        .auth-button {
-            width: 100%;
-            padding: 1rem;
-            background: linear-gradient(45deg, #1f77b4, #ff7f0e);
-            color: white;
-            border: none;
-            border-radius: 0.5rem;
-            font-size: 1.1rem;
-            font-weight: 600;
-            cursor: pointer;
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }
-        
-        .auth-button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 10px 20px rgba(0,0,0,0.2);
-        }
-        
-        .auth-button:disabled {
-            opacity: 0.6;
-            cursor: not-allowed;
-            transform: none;
-        }
-        
-        .auth-links {
-            text-align: center;
-            margin-top: 1.5rem;
-        }
-        
-        .auth-link {
-            color: #1f77b4;
-            text-decoration: none;
-            margin: 0 0.5rem;
-        }
-        
-        .auth-link:hover {
-            text-decoration: underline;
-        }
-        
-        .error-message {
-            background: #fee;
-            color: #c33;
-            padding: 1rem;
-            border-radius: 0.5rem;
-            border-left: 4px solid #c33;
-            margin-bottom: 1rem;
-        }
-        
-        .success-message {
-            background: #efe;
-            color: #363;
-            padding: 1rem;
-            border-radius: 0.5rem;
-            border-left: 4px solid #363;
-            margin-bottom: 1rem;
-        }
-        
-        .info-message {
-            background: #eef;
-            color: #336;
-            padding: 1rem;
-            border-radius: 0.5rem;
-            border-left: 4px solid #336;
-            margin-bottom: 1rem;
-        }
-        
-        /* Password Strength Indicator */
-        .password-strength {
-            margin-top: 0.5rem;
-            font-size: 0.9rem;
-        }
-        
-        .strength-weak { color: #e74c3c; }
-        .strength-medium { color: #f39c12; }
-        .strength-strong { color: #27ae60; }
-        
-        /* Two-Factor Authentication */
-        .two-factor-section {
-            background: #f8f9fa;
-            padding: 1.5rem;
-            border-radius: 0.5rem;
-            margin: 1rem 0;
-        }
-        
-        .qr-code {
-            text-align: center;
-            margin: 1rem 0;
-        }
-        
-        /* Responsive Design */
-        @media (max-width: 768px) {
-            .auth-container {
-                margin: 1rem;
-                padding: 1.5rem;
-            }
-        }
-        </style>
-        """, unsafe_allow_html=True)
+        st.markdown(_AUTH_CSS_LINK, unsafe_allow_html=True)
     
     def hash_password(self, password: str) -> str:
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password using salted argon2"""
+        return pwd_context.hash(password)
     
     def validate_password(self, password: str) -> dict:
         """Validate password strength"""
         errors = []
         strength = 0
         
-        if len(password) < 8:
+        classes = password.encode().translate(_CHARCLASS_LUT)
+        
+        if len(password) < _MIN_PASSWORD_LENGTH:
             errors.append("Password must be at least 8 characters long")
         else:
             strength += 1
         
-        if re.search(r"[A-Z]", password):
+        if _CLASS_UPPER in classes:
             strength += 1
         else:
             errors.append("Password must contain at least one uppercase letter")
         
-        if re.search(r"[a-z]", password):
+        if _CLASS_LOWER in classes:
             strength += 1
         else:
             errors.append("Password must contain at least one lowercase letter")
         
-        if re.search(r"\d", password):
+        if _CLASS_DIGIT in classes:
             strength += 1
         else:
             errors.append("Password must contain at least one number")
         
-        if re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
+        if _CLASS_SPECIAL in classes:
             strength += 1
         else:
             errors.append("Password must contain at least one special character")
@@ -295,79 +242,142 @@ class AuthenticationSystem:
     
     def validate_email(self, email: str) -> bool:
         """Validate email format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return _RE_EMAIL.match(email) is not None
+    
+    def _validate_new_user(self, username: str, email: str, password: str) -> dict:
+        """Validate registration fields; return the error, or None if they are acceptable"""
+        if not username or not email or not password:
+            return {'error': 'All fields are required'}
+        
+        if len(username) > _MAX_LOGIN_LENGTH or len(email) > _MAX_LOGIN_LENGTH:
+            return {'error': 'Username or email is too long'}
+        
+        if not self.validate_email(email):
+            return {'error': 'Invalid email format'}
+        
+        password_validation = self.validate_password(password)
+        if not password_validation['valid']:
+            return {'error': 'Password does not meet requirements', 'details': password_validation['errors']}
+        
+        return None
     
     def create_user(self, username: str, email: str, password: str, full_name: str = "", company: str = "") -> dict:
         """Create new user account"""
         try:
             # Validate inputs
-            if not username or not email or not password:
-                return {'success': False, 'error': 'All fields are required'}
-            
-            if not self.validate_email(email):
-                return {'success': False, 'error': 'Invalid email format'}
-            
-            password_validation = self.validate_password(password)
-            if not password_validation['valid']:
-                return {'success': False, 'error': 'Password does not meet requirements', 'details': password_validation['errors']}
+            error = self._validate_new_user(username, email, password)
+            if error:
+                return {'success': False, **error}
             
             # Check if user already exists
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT id FROM users WHERE username = ? OR email = ?", (username, email))
-            if cursor.fetchone():
-                conn.close()
-                return {'success': False, 'error': 'Username or email already exists'}
+            with self._lock:
+                cursor = self._conn.execute("SELECT id FROM users WHERE username = ? OR email = ?", (username, email))
+                if cursor.fetchone():
+                    return {'success': False, 'error': 'Username or email already exists'}
             
-            # Create user
+            # Create user; hashing happens outside the lock and the UNIQUE
+            # columns still reject a concurrent registration of the same name
             password_hash = self.hash_password(password)
-            cursor.execute('''
-                INSERT INTO users (username, email, password_hash, full_name, company)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (username, email, password_hash, full_name, company))
+            with self._lock, self._conn:
+                cursor = self._conn.execute('''
+                    INSERT INTO users (username, email, password_hash, full_name, company)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (username, email, password_hash, full_name, company))
             
             user_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
             
             return {'success': True, 'user_id': user_id, 'message': 'Account created successfully'}
             
         except Exception as e:
             return {'success': False, 'error': f'Account creation failed: {e}'}
     
+    def create_users_bulk(self, users: list) -> dict:
+        """Create several user accounts (dicts of create_user arguments) in one transaction"""
+        try:
+            # Load taken usernames and emails once instead of querying per row
+            with self._lock:
+                cursor = self._conn.execute("SELECT username, email FROM users")
+                taken = {value for row in cursor.fetchall() for value in row}
+            
+            rows = []
+            failed = []
+            for user in users:
+                username = user.get('username', '')
+                email = user.get('email', '')
+                
+                error = self._validate_new_user(username, email, user.get('password', ''))
+                if not error and (username in taken or email in taken):
+                    error = {'error': 'Username or email already exists'}
+                if error:
+                    failed.append({'username': username, **error})
+                    continue
+                
+                # Only accepted rows pay for hashing
+                taken.update((username, email))
+                rows.append((
+                    username, email, self.hash_password(user['password']),
+                    user.get('full_name', ''), user.get('company', '')
+                ))
+            
+            with self._lock, self._conn:
+                self._conn.executemany('''
+                    INSERT INTO users (username, email, password_hash, full_name, company)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', rows)
+            
+            return {
+                'success': True,
+                'created': len(rows),
+                'failed': failed,
+                'message': f'{len(rows)} accounts created'
+            }
+            
+        except Exception as e:
+            return {'success': False, 'error': f'Bulk account creation failed: {e}'}
+    
     def authenticate_user(self, username: str, password: str) -> dict:
         """Authenticate user login"""
+        if not username or not password or len(username) > _MAX_LOGIN_LENGTH or len(password) < _MIN_PASSWORD_LENGTH:
+            return {'success': False, 'error': 'Invalid credentials or account inactive'}
+        
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            # Check credentials
-            cursor.execute("SELECT id, username, email, full_name, role FROM users WHERE (username = ? OR email = ?) AND password_hash = ? AND is_active = 1", 
-                         (username, username, self.hash_password(password)))
+            # Check credentials; registered emails always contain "@", so any
+            # other login can only be a username and needs a single index seek
+            if '@' in username:
+                query, params = _LOGIN_BY_USERNAME_OR_EMAIL, (username, username)
+            else:
+                query, params = _LOGIN_BY_USERNAME, (username,)
+            with self._lock:
+                user = self._conn.execute(query, params).fetchone()
             
-            user = cursor.fetchone()
             if not user:
-                conn.close()
                 return {'success': False, 'error': 'Invalid credentials or account inactive'}
             
-            user_id, username, email, full_name, role = user
+            user_id, username, email, full_name, role, password_hash = user
             
-            # Update last login
-            cursor.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = ?", (user_id,))
+            # Verify outside the lock so one slow hash does not stall other logins
+            verified, new_hash = pwd_context.verify_and_update(password, password_hash)
+            if not verified:
+                return {'success': False, 'error': 'Invalid credentials or account inactive'}
             
             # Create session
             session_token = self.generate_session_token()
             expires_at = datetime.now() + timedelta(days=7)
             
-            cursor.execute('''
-                INSERT INTO sessions (user_id, session_token, expires_at, ip_address, user_agent)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, session_token, expires_at, "127.0.0.1", "AutoPPM Web"))
-            
-            conn.commit()
-            conn.close()
+            with self._lock, self._conn:
+                # Update last login, upgrading legacy hashes now that the
+                # plain password is known (new_hash is None otherwise)
+                self._conn.execute("UPDATE users SET last_login = CURRENT_TIMESTAMP, password_hash = COALESCE(?, password_hash) WHERE id = ?",
+                                   (new_hash, user_id))
+                
+                self._conn.execute('''
+                    INSERT INTO sessions (user_id, session_token, expires_at, ip_address, user_agent)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (user_id, session_token, expires_at, "127.0.0.1", "AutoPPM Web"))
+                
+                self._login_counter += 1
+                if self._login_counter % _SESSION_SWEEP_EVERY == 0:
+                    self._conn.execute("DELETE FROM sessions WHERE expires_at < CURRENT_TIMESTAMP")
             
             # Store in session state
             st.session_state.authenticated = True
@@ -393,32 +403,35 @@ class AuthenticationSystem:
     
     def generate_session_token(self) -> str:
         """Generate unique session token"""
-        timestamp = str(int(time.time()))
-        random_component = hashlib.md5(f"{timestamp}{st.session_state.get('username', '')}".encode()).hexdigest()
-        return f"{timestamp}_{random_component}"
+        return f"{int(time.time())}_{secrets.token_hex(16)}"
     
     def validate_session(self, session_token: str) -> dict:
         """Validate session token"""
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT s.user_id, s.expires_at, u.username, u.email, u.full_name, u.role
-                FROM sessions s
-                JOIN users u ON s.user_id = u.id
-                WHERE s.session_token = ? AND s.expires_at > CURRENT_TIMESTAMP
-            ''', (session_token,))
-            
-            session = cursor.fetchone()
-            conn.close()
+            now = time.monotonic()
+            with self._lock:
+                cached = self._session_cache.get(session_token)
+                if cached:
+                    cached_until, result = cached
+                    if now < cached_until and datetime.fromisoformat(result['expires_at']) > datetime.now():
+                        return dict(result)
+                    del self._session_cache[session_token]
+                
+                cursor = self._conn.execute('''
+                    SELECT s.user_id, s.expires_at, u.username, u.email, u.full_name, u.role
+                    FROM sessions s
+                    JOIN users u ON s.user_id = u.id
+                    WHERE s.session_token = ? AND s.expires_at > CURRENT_TIMESTAMP
+                ''', (session_token,))
+                
+                session = cursor.fetchone()
             
             if not session:
                 return {'valid': False, 'error': 'Invalid or expired session'}
             
             user_id, expires_at, username, email, full_name, role = session
             
-            return {
+            result = {
                 'valid': True,
                 'user_id': user_id,
                 'username': username,
@@ -428,6 +441,14 @@ class AuthenticationSystem:
                 'expires_at': expires_at
             }
             
+            with self._lock:
+                if len(self._session_cache) >= _SESSION_CACHE_MAX:
+                    # Dicts keep insertion order, so this drops the oldest entry
+                    del self._session_cache[next(iter(self._session_cache))]
+                self._session_cache[session_token] = (now + _SESSION_CACHE_TTL, result)
+            
+            return dict(result)
+            
         except Exception as e:
             return {'valid': False, 'error': f'Session validation failed: {e}'}
     
@@ -436,11 +457,9 @@ class AuthenticationSystem:
         try:
             if 'session_token' in st.session_state:
                 # Remove session from database
-                conn = sqlite3.connect(str(self.db_path))
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM sessions WHERE session_token = ?", (st.session_state.session_token,))
-                conn.commit()
-                conn.close()
+                with self._lock, self._conn:
+                    self._session_cache.pop(st.session_state.session_token, None)
+                    self._conn.execute("DELETE FROM sessions WHERE session_token = ?", (st.session_state.session_token,))
             
             # Clear session state
             for key in ['authenticated', 'user_id', 'username', 'email', 'full_name', 'role', 'session_token']:
@@ -455,14 +474,7 @@ class AuthenticationSystem:
     
     def render_login_form(self):
         """Render login form"""
-        st.markdown("""
-        <div class="auth-container">
-            <div class="auth-header">
-                <h1 class="auth-title">🚀 Welcome Back</h1>
-                <p class="auth-subtitle">Sign in to your AutoPPM account</p>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_LOGIN_HEADER, unsafe_allow_html=True)
         
         with st.container():
             st.markdown('<div class="auth-container">', unsafe_allow_html=True)
@@ -503,14 +515,7 @@ class AuthenticationSystem:
     
     def render_register_form(self):
         """Render registration form"""
-        st.markdown("""
-        <div class="auth-container">
-            <div class="auth-header">
-                <h1 class="auth-title">🚀 Join AutoPPM</h1>
-                <p class="auth-subtitle">Create your professional trading account</p>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_REGISTER_HEADER, unsafe_allow_html=True)
         
         with st.container():
             st.markdown('<div class="auth-container">', unsafe_allow_html=True)
@@ -575,14 +580,7 @@ class AuthenticationSystem:
     
     def render_forgot_password(self):
         """Render forgot password form"""
-        st.markdown("""
-        <div class="auth-container">
-            <div class="auth-header">
-                <h1 class="auth-title">🔐 Reset Password</h1>
-                <p class="auth-subtitle">Enter your email to receive reset instructions</p>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(_FORGOT_PASSWORD_HEADER, unsafe_allow_html=True)
         
         with st.container():
             st.markdown('<div class="auth-container">', unsafe_allow_html=True)
@@ -613,6 +611,8 @@ class AuthenticationSystem:
             layout="centered"
         )
         
+        self.load_custom_css()
+        
         # Check if user is already authenticated
         if 'authenticated' in st.session_state and st.session_state.authenticated:
             st.success("✅ Already authenticated! Redirecting to dashboard...")
@@ -620,8 +620,7 @@ class AuthenticationSystem:
             return
         
         # Get page parameter
-        params = st.experimental_get_query_params()
-        page = params.get("page", ["login"])[0]
+        page = st.query_params.get("page", "login")
         
         # Render appropriate page
         if page == "register":
@@ -632,6 +631,13 @@ class AuthenticationSystem:
             self.render_login_form()
 
 
+@st.cache_resource
+def get_auth_system() -> AuthenticationSystem:
+    """Return the process-wide AuthenticationSystem, built on first use"""
+    # The instance only holds the database connection, its lock and the
+    # session cache; per-user state stays in st.session_state
+    return AuthenticationSystem()
+
+
 if __name__ == "__main__":
-    auth_system = AuthenticationSystem()
-    auth_system.run()
+    get_auth_system().run()
@@ -664,17 +664,19 @@ class PortfolioDashboard:
     
     # Helper methods
     
-    def _render_metric_card(self, title: str, value: str, change: str, change_type: str):
-        """Render a metric card"""
+    def _render_metric_card(self, title: str, value: str, change: str, change_type: str) -> str:
+        """Render a metric card and return its HTML"""
         change_color = {"positive": "🟢", "negative": "🔴", "neutral": "🟡"}
         
-        st.markdown(f"""
+        html = f"""
         <div class="metric-card">
             <h3>{title}</h3>
             <h2>{value}</h2>
             <p>{change_color[change_type]} {change}</p>
         </div>
-        """, unsafe_allow_html=True)
+        """
+        st.markdown(html, unsafe_allow_html=True)
+        return html
     
     def _get_sample_portfolio_data(self) -> pd.DataFrame:
         """Get sample portfolio data for demonstration"""
@@ -804,9 +806,10 @@ class PortfolioDashboard:
         dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
         
         data = {
-            'date': dates,
+            'date': list(dates) * 3,
             'strategy': ['Momentum'] * 30 + ['Mean Reversion'] * 30 + ['Multi-Factor'] * 30,
-            'cumulative_return': list(np.random.normal(0.001, 0.02, 30).cumsum() * 100) * 3
+            # One independent 30-day return path per strategy
+            'cumulative_return': (np.random.normal(0.001, 0.02, (3, 30)).cumsum(axis=1) * 100).ravel()
         }
         
         return pd.DataFrame(data)
@@ -921,6 +924,10 @@ class PortfolioDashboard:
             'order_id': f"ORD_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         }
     
+    def _place_orders_bulk(self, orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Place several orders; each order dict holds the _place_order arguments"""
+        return [self._place_order(**order) for order in orders]
+    
     def _get_recent_orders(self) -> List[Dict[str, Any]]:
         """Get recent orders"""
         return [